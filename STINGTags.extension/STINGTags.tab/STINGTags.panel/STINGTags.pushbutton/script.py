@@ -27,7 +27,9 @@ __title__ = "STING\nTags"
 __author__ = "Author"
 __persistentengine__ = True   # keep IronPython engine alive for modeless panel
 
-import os, sys, math, random
+import os, sys, math, random, re, time
+from array import array
+from bisect import bisect_left
 
 # Extension root: pushbutton → panel → tab → extension
 _ext_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -37,6 +39,135 @@ _cfg  = os.path.join(_ext_root, 'config')
 if _lib not in sys.path:
     sys.path.insert(0, _lib)
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Uniform-grid spatial index (shared by the layout engines and handlers)
+# ─────────────────────────────────────────────────────────────────────────────
+# Cells east / north-east / north / north-west of a cell: scanning only
+# this half of the 3×3 neighbourhood visits every adjacent pair once.
+_HALF_NEIGHBOURS = ((1, -1), (1, 0), (1, 1), (0, 1))
+# The full 3×3 neighbourhood, for single-tag queries
+_ALL_NEIGHBOURS  = tuple((ox, oy) for ox in (-1, 0, 1) for oy in (-1, 0, 1))
+
+
+def _build_grid(px, py, cell):
+    """Bucket point indices into square cells of side `cell`.
+    Returns {(ix, iy): [indices]}."""
+    grid = {}
+    for i, x, y in zip(range(len(px)), px, py):
+        key = (int(x // cell), int(y // cell))
+        bucket = grid.get(key)
+        if bucket is None:
+            grid[key] = [i]
+        else:
+            bucket.append(i)
+    return grid
+
+
+def _grid_pairs(grid):
+    """Yield every (i, j) index pair in the same or an adjacent cell, once.
+    Points further apart than one cell never share a pair."""
+    for (cx, cy), bucket in grid.items():
+        n = len(bucket)
+        for a in range(n):
+            i = bucket[a]
+            for b in range(a + 1, n):
+                yield i, bucket[b]
+        for ox, oy in _HALF_NEIGHBOURS:
+            other = grid.get((cx + ox, cy + oy))
+            if other:
+                for i in bucket:
+                    for j in other:
+                        yield i, j
+
+
+def _sweep_box_pairs(x0s, y0s, x1s, y1s):
+    """Yield every (i, j) pair of overlapping boxes, once, by sort and
+    sweep along X.  Unlike a grid it doesn't degrade when boxes crowd
+    into one cell or span many."""
+    active = []
+    for i in sorted(range(len(x0s)), key=x0s.__getitem__):
+        x0, x1, y0, y1 = x0s[i], x1s[i], y0s[i], y1s[i]
+        # Boxes ending at or before this one's left edge never come back
+        active = [j for j in active if x1s[j] > x0]
+        for j in active:
+            if x0s[j] < x1 and y0s[j] < y1 and y1s[j] > y0:
+                yield j, i
+        active.append(i)
+
+
+def _grid_neighbour_counts(px, py, r, grid=None):
+    """Number of other points strictly within r of each point.
+    `grid` may be a prebuilt _build_grid(px, py, r)."""
+    counts = [0] * len(px)
+    r2 = r * r
+    if grid is None:
+        grid = _build_grid(px, py, r)
+    for i, j in _grid_pairs(grid):
+        dx = px[i] - px[j]; dy = py[i] - py[j]
+        if dx * dx + dy * dy < r2:
+            counts[i] += 1; counts[j] += 1
+    return counts
+
+
+def _grid_count_within(grid, px, py, cell, x, y):
+    """Number of points strictly within `cell` of (x, y), where `grid` is
+    _build_grid(px, py, cell); only the 3x3 cells around (x, y) can hit."""
+    cx, cy = int(x // cell), int(y // cell)
+    r2 = cell * cell
+    n = 0
+    get = grid.get
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            for j in get((cx + ox, cy + oy), ()):
+                dx = px[j] - x; dy = py[j] - y
+                if dx * dx + dy * dy < r2:
+                    n += 1
+    return n
+
+
+def _grid_nearest_d2(px, py):
+    """Squared distance from each point to its nearest other point (inf for
+    a lone point).  Rings of cells are searched outwards from each point's
+    cell until nothing unvisited can be closer than the best found."""
+    n = len(px)
+    inf = float('inf')
+    out = array('d', [inf]) * n
+    if n < 2:
+        return out
+    w = max(px) - min(px); h = max(py) - min(py)
+    # About one point per cell; a line of points sizes cells along it
+    cell = max(math.sqrt(w * h / n), max(w, h) / n, 1e-6)
+    grid = _build_grid(px, py, cell)
+    max_r = int(max(w, h) / cell) + 2
+    get = grid.get
+    for i in range(n):
+        x = px[i]; y = py[i]
+        cx, cy = int(x // cell), int(y // cell)
+        best = inf
+        r = 0
+        while r <= max_r:
+            if r == 0:
+                cells = ((cx, cy),)
+            else:
+                cells = [(cx + o, cy + s) for o in range(-r, r + 1)
+                         for s in (-r, r)]
+                cells += [(cx + s, cy + o) for o in range(-r + 1, r)
+                          for s in (-r, r)]
+            for key in cells:
+                for j in get(key, ()):
+                    if j == i: continue
+                    dx = px[j] - x; dy = py[j] - y
+                    d2 = dx * dx + dy * dy
+                    if d2 < best: best = d2
+            # Cells beyond ring r are at least r cells away
+            reach = r * cell
+            if best <= reach * reach:
+                break
+            r += 1
+        out[i] = best
+    return out
+
+
 try:
     from selection_engine import (
         Vec2, SelectionEngine, SmartOrganizer, PatternLearner,
@@ -52,6 +183,92 @@ except Exception:
         def dist(self, o): return math.sqrt((self.x-o.x)**2+(self.y-o.y)**2)
     # Pure-Python engine implementations — used when the C# module is absent
 
+    def _repulse_forces(px, py, sp, reach):
+        """Pairwise repulsion for one sweep over flat coordinate lists.
+
+        Positions are binned into a grid of cell size `reach` so only
+        tags in neighbouring cells are tested.  Each pair is visited once
+        and the push is applied to both tags (equal and opposite).
+        Forces are computed from a snapshot of the positions and returned
+        as (fx, fy) lists; px/py are not modified.
+        """
+        n  = len(px)
+        fx = [0.0] * n
+        fy = [0.0] * n
+        reach2 = reach * reach
+        sqrt   = math.sqrt
+        for i, j in _grid_pairs(_build_grid(px, py, reach or 1e-6)):
+            dx = px[i] - px[j]
+            dy = py[i] - py[j]
+            d2 = dx * dx + dy * dy
+            if d2 < reach2:
+                # Compare squared distances; sqrt only pairs that push
+                d = sqrt(d2) or 1e-6
+                push = (sp - d) / d * 0.3
+                dx *= push; dy *= push
+                fx[i] += dx; fy[i] += dy
+                fx[j] -= dx; fy[j] -= dy
+        return fx, fy
+
+    def _layout_score(px, py, ex, ey, sp):
+        """Overlap + leader-length penalty shared by SimAnneal and GeneticAlg.
+        Only pairs in neighbouring grid cells can be closer than `sp`."""
+        total = 0.0
+        sp2   = sp * sp
+        sqrt  = math.sqrt
+        for i, j in _grid_pairs(_build_grid(px, py, sp or 1e-6)):
+            dx = px[i] - px[j]
+            dy = py[i] - py[j]
+            d2 = dx * dx + dy * dy
+            if d2 < sp2:
+                d = sqrt(d2)
+                total += (sp - d) * (sp - d)
+        # Leader-length penalty
+        ldr = 0.0
+        for x, y, hx, hy in zip(px, py, ex, ey):
+            dx = x - hx
+            dy = y - hy
+            ldr += sqrt(dx * dx + dy * dy)
+        return total + ldr * 0.1
+
+    def _force_kernel(px, py, ex, ey, sp, reach, iters):
+        """Run `iters` force sweeps in place on flat float lists.
+
+        Pure numeric loops over plain lists — no dicts, Vec2 or Revit
+        objects — so callers pack coordinates once and unpack once.
+        ex/ey pull each tag back toward its host when the leader exceeds
+        3 × spacing; pass None to run repulsion only.
+
+        Repulsion is cut off at `reach`, so there is no far field for a
+        Barnes–Hut tree to approximate — the grid in _repulse_forces is
+        already exact and near-linear.  Sweeps stop early once no tag
+        moves more than a small fraction of the spacing.
+        """
+        idx     = range(len(px))
+        max_ldr = sp * 3.0
+        settle  = sp * 1e-4
+        sqrt    = math.sqrt
+        for _ in range(iters):
+            fx, fy = _repulse_forces(px, py, sp, reach)
+            if ex is not None:
+                for i in idx:
+                    # Weak attraction toward host element (limit leader length)
+                    lx = ex[i] - px[i]
+                    ly = ey[i] - py[i]
+                    ed = sqrt(lx * lx + ly * ly)
+                    if ed > max_ldr:
+                        pull = (ed - max_ldr) / ed * 0.15
+                        fx[i] += lx * pull
+                        fy[i] += ly * pull
+            step = 0.0
+            for i in idx:
+                px[i] += fx[i]
+                py[i] += fy[i]
+                m = abs(fx[i]) + abs(fy[i])
+                if m > step: step = m
+            if step < settle:
+                break
+
     class ForceEngine(object):
         """Force-directed repulsion to separate overlapping tags."""
         def __init__(self, data, spacing):
@@ -60,80 +277,158 @@ except Exception:
 
         def run(self, iters=40):
             data = self._data
-            sp   = self._sp
-            for _ in range(iters):
-                for i in range(len(data)):
-                    pi = data[i]['pos']
-                    fx = fy = 0.0
-                    for j in range(len(data)):
-                        if i == j: continue
-                        pj = data[j]['pos']
-                        dx = pi.x - pj.x
-                        dy = pi.y - pj.y
-                        d  = math.sqrt(dx * dx + dy * dy) or 1e-6
-                        if d < sp:
-                            push = (sp - d) / d * 0.3
-                            fx += dx * push
-                            fy += dy * push
-                    # Weak attraction toward host element (limit leader length)
-                    ei = data[i]['elem']
-                    ex = ei.x - pi.x
-                    ey = ei.y - pi.y
-                    ed = math.sqrt(ex * ex + ey * ey)
-                    max_ldr = sp * 3.0
-                    if ed > max_ldr:
-                        pull = (ed - max_ldr) / ed * 0.15
-                        fx += ex * pull
-                        fy += ey * pull
-                    pi.x += fx
-                    pi.y += fy
+            # Work on flat coordinate lists; write back to Vec2 once at the end
+            px = [d['pos'].x for d in data]
+            py = [d['pos'].y for d in data]
+            _force_kernel(px, py,
+                          [d['elem'].x for d in data],
+                          [d['elem'].y for d in data],
+                          self._sp, self._sp, iters)
+            for d, x, y in zip(data, px, py):
+                d['pos'].x, d['pos'].y = x, y
 
     class SimAnneal(object):
         """Simulated annealing for global tag-layout optimisation."""
+        CHAINS = 4   # independent chains started by run_parallel
+
         def __init__(self, data, spacing):
             self._data = data
             self._sp   = float(spacing)
+            self._rng  = random
 
         def _score(self):
-            data = self._data
+            return _layout_score(self._px, self._py, self._ex, self._ey, self._sp)
+
+        def _contrib(self, i, x, y):
+            """Penalty tag i carries at (x, y): overlaps with its grid
+            neighbours plus its own leader length.  Moving one tag changes
+            the total score by exactly the change in this value."""
             sp   = self._sp
+            sp2  = sp * sp
+            cell = self._cell
+            get  = self._grid.get
+            sqrt = math.sqrt
+            px, py = self._px, self._py
+            cx, cy = int(x // cell), int(y // cell)
             total = 0.0
-            for i in range(len(data)):
-                pi = data[i]['pos']
-                ei = data[i]['elem']
-                for j in range(i + 1, len(data)):
-                    pj = data[j]['pos']
-                    d  = math.sqrt((pi.x - pj.x) ** 2 + (pi.y - pj.y) ** 2)
-                    if d < sp:
-                        total += (sp - d) ** 2
-                # Leader-length penalty
-                total += math.sqrt((pi.x - ei.x) ** 2 + (pi.y - ei.y) ** 2) * 0.1
-            return total
+            for ox, oy in _ALL_NEIGHBOURS:
+                for j in get((cx + ox, cy + oy), ()):
+                    if j == i: continue
+                    dx = x - px[j]
+                    dy = y - py[j]
+                    d2 = dx * dx + dy * dy
+                    if d2 < sp2:
+                        d = sqrt(d2)
+                        total += (sp - d) * (sp - d)
+            lx = x - self._ex[i]
+            ly = y - self._ey[i]
+            return total + sqrt(lx * lx + ly * ly) * 0.1
 
         def run(self, iters=600):
             data = self._data
+            if not data: return
+            px = [d['pos'].x for d in data]
+            py = [d['pos'].y for d in data]
+            self._anneal(px, py,
+                         [d['elem'].x for d in data],
+                         [d['elem'].y for d in data], iters)
+            for d, x, y in zip(data, px, py):
+                d['pos'].x, d['pos'].y = x, y
+
+        def run_parallel(self, iters=600, n_starts=None):
+            """Multi-start annealing: run independent chains from the current
+            layout, each with its own RNG, and keep the best result.
+
+            Chains share nothing but the read-only host centres, so they run
+            on plain threads (IronPython has no GIL); any chain that could
+            not be run on a thread is run serially.
+            """
+            data = self._data
+            if not data: return
+            n_starts = max(1, n_starts or self.CHAINS)
+            px0 = [d['pos'].x for d in data]
+            py0 = [d['pos'].y for d in data]
+            ex  = [d['elem'].x for d in data]
+            ey  = [d['elem'].y for d in data]
+            seeds   = [random.random() for _ in range(n_starts)]
+            results = [None] * n_starts
+
+            def _chain(k):
+                sa = SimAnneal(None, self._sp)
+                sa._rng = random.Random(seeds[k])
+                px, py = list(px0), list(py0)
+                results[k] = (sa._anneal(px, py, ex, ey, iters), px, py)
+
+            if n_starts > 1:
+                try:
+                    import threading
+                    threads = [threading.Thread(target=_chain, args=(k,))
+                               for k in range(n_starts)]
+                    for th in threads: th.start()
+                    for th in threads: th.join()
+                except Exception:
+                    pass
+            for k in range(n_starts):
+                if results[k] is None: _chain(k)
+            _best, px, py = min(results, key=lambda r: r[0])
+            for d, x, y in zip(data, px, py):
+                d['pos'].x, d['pos'].y = x, y
+
+        def _anneal(self, px, py, ex, ey, iters):
+            """Anneal flat coordinate lists in place; px/py end at the best
+            layout found.  Returns the best score."""
+            n = len(px)
+            if not n: return 0.0
             sp   = self._sp
-            best_score = self._score()
-            best_pos   = [(d['pos'].x, d['pos'].y) for d in data]
+            rng  = self._rng
+            self._px, self._py, self._ex, self._ey = px, py, ex, ey
+            cell = self._cell = sp or 1e-6
+            grid = self._grid = _build_grid(px, py, cell)
+            keys = [(int(x // cell), int(y // cell)) for x, y in zip(px, py)]
+            score      = self._score()   # full sweep once; deltas afterwards
+            best_score = score
+            # Best layout snapshot, kept current via the set of tags moved
+            # since it was last taken — no full copy per improvement
+            best_px, best_py = list(px), list(py)
+            dirty      = set()
             T          = sp * 2.0
-            cooling    = math.exp(math.log(0.01) / max(iters, 1))  # T → 0.01*T0
+            cooling    = 0.01 ** (1.0 / max(iters, 1))  # T → 0.01*T0
+            # Hot-loop names bound once
+            _exp, _rand, _rr = math.exp, rng.random, rng.randint
+            contrib = self._contrib
+            last    = n - 1
             for _ in range(iters):
-                idx  = random.randint(0, len(data) - 1)
-                p    = data[idx]['pos']
-                ox, oy = p.x, p.y
-                p.x += (random.random() - 0.5) * T
-                p.y += (random.random() - 0.5) * T
-                score = self._score()
-                delta = score - best_score
-                if delta < 0 or random.random() < math.exp(-delta / max(T, 1e-9)):
+                if T < 1e-9:
+                    break   # frozen — no move can be accepted or made
+                idx  = _rr(0, last)
+                ox, oy = px[idx], py[idx]
+                nx = ox + (_rand() - 0.5) * T
+                ny = oy + (_rand() - 0.5) * T
+                delta = contrib(idx, nx, ny) - contrib(idx, ox, oy)
+                accept = delta < 0
+                if not accept:
+                    # exp(-50) ≈ 2e-22: hopeless uphill moves are rejected
+                    # without an exp() call or a random draw
+                    x = delta / T
+                    accept = x < 50.0 and _rand() < _exp(-x)
+                if accept:
+                    px[idx], py[idx] = nx, ny
+                    key = (int(nx // cell), int(ny // cell))
+                    if key != keys[idx]:
+                        grid[keys[idx]].remove(idx)
+                        grid.setdefault(key, []).append(idx)
+                        keys[idx] = key
+                    score += delta
+                    dirty.add(idx)
                     if score < best_score:
                         best_score = score
-                        best_pos   = [(d['pos'].x, d['pos'].y) for d in data]
-                else:
-                    p.x, p.y = ox, oy
+                        for i in dirty:
+                            best_px[i] = px[i]; best_py[i] = py[i]
+                        dirty.clear()
                 T *= cooling
-            for d, (bx, by) in zip(data, best_pos):
-                d['pos'].x, d['pos'].y = bx, by
+            for i in dirty:
+                px[i] = best_px[i]; py[i] = best_py[i]
+            return best_score
 
     class GeneticAlg(object):
         """Genetic algorithm for tag layout — population of position sets."""
@@ -148,24 +443,21 @@ except Exception:
             for d, (x, y) in zip(self._data, chrom):
                 d['pos'].x, d['pos'].y = x, y
 
-        def _score(self):
-            data = self._data
-            sp   = self._sp
-            total = 0.0
-            for i in range(len(data)):
-                pi = data[i]['pos']
-                ei = data[i]['elem']
-                for j in range(i + 1, len(data)):
-                    pj = data[j]['pos']
-                    d  = math.sqrt((pi.x - pj.x) ** 2 + (pi.y - pj.y) ** 2)
-                    if d < sp:
-                        total += (sp - d) ** 2
-                total += math.sqrt((pi.x - ei.x) ** 2 + (pi.y - ei.y) ** 2) * 0.1
-            return total
+        def _score_chrom(self, chrom, ex, ey):
+            """Score a chromosome directly — the shared data is not touched."""
+            return _layout_score([c[0] for c in chrom], [c[1] for c in chrom],
+                                 ex, ey, self._sp)
 
         def run(self, pop_size=20, gens=30):
             sp   = self._sp
             base = self._encode()
+            if not base: return
+            # Sizes are fixed for the whole run
+            last     = len(base) - 1
+            cut_hi   = max(1, last)
+            n_keep   = max(2, pop_size // 2)
+            ex   = [d['elem'].x for d in self._data]
+            ey   = [d['elem'].y for d in self._data]
             # Seed population with random perturbations
             pop  = [[(x + (random.random() - 0.5) * sp * 0.5,
                       y + (random.random() - 0.5) * sp * 0.5)
@@ -175,24 +467,21 @@ except Exception:
             best_chrom = base
             best_score = float('inf')
             for _gen in range(gens):
-                self._apply(best_chrom)
-                scored = []
-                for chrom in pop:
-                    self._apply(chrom)
-                    scored.append((self._score(), list(chrom)))
+                scored = [(self._score_chrom(chrom, ex, ey), chrom)
+                          for chrom in pop]
                 scored.sort(key=lambda x: x[0])
                 if scored[0][0] < best_score:
                     best_score  = scored[0][0]
                     best_chrom  = scored[0][1]
-                survivors = [c for _, c in scored[:max(2, pop_size // 2)]]
+                survivors = [c for _, c in scored[:n_keep]]
                 next_pop  = list(survivors)
-                while len(next_pop) < pop_size:
+                for _ in range(pop_size - len(next_pop)):
                     a   = random.choice(survivors)
                     b   = random.choice(survivors)
-                    cut = random.randint(1, max(1, len(a) - 1))
-                    child = list(a[:cut]) + list(b[cut:])
+                    cut = random.randint(1, cut_hi)
+                    child = a[:cut] + b[cut:]
                     if random.random() < 0.2:
-                        idx    = random.randint(0, len(child) - 1)
+                        idx    = random.randint(0, last)
                         cx, cy = child[idx]
                         child[idx] = (cx + (random.random() - 0.5) * sp * 0.3,
                                       cy + (random.random() - 0.5) * sp * 0.3)
@@ -203,42 +492,54 @@ except Exception:
     class PatternLearner(object):
         """Accumulate tag-placement offsets per category; apply as averaged nudges."""
         def __init__(self):
-            self._offsets = {}   # category → [(dx, dy), ...]
+            self._sums = {}   # category → [count, sum_dx, sum_dy]
 
         def learn(self, data):
             count = 0
+            sums  = self._sums
             for d in data:
                 try:
-                    cat = (d['tag'].Category.Name
-                           if d['tag'].Category else 'Unknown')
+                    tag = d['tag']
+                    cat = tag.Category.Name if tag.Category else 'Unknown'
                     dx  = d['pos'].x - d['elem'].x
                     dy  = d['pos'].y - d['elem'].y
-                    self._offsets.setdefault(cat, []).append((dx, dy))
+                    acc = sums.get(cat)
+                    if acc is None:
+                        sums[cat] = [1, dx, dy]
+                    else:
+                        acc[0] += 1; acc[1] += dx; acc[2] += dy
                     count += 1
                 except Exception:
                     pass
             return '{} patterns learned ({} categories)'.format(
-                count, len(self._offsets))
+                count, len(sums))
 
         def apply(self, data):
+            # Category averages are constant for the whole call — compute once
+            avgs = dict((cat, (sdx / n, sdy / n))
+                        for cat, (n, sdx, sdy) in self._sums.items())
+            fallback = avgs.get('Unknown')
             count = 0
             for d in data:
                 try:
-                    cat  = (d['tag'].Category.Name
-                            if d['tag'].Category else 'Unknown')
-                    offs = self._offsets.get(cat) or self._offsets.get('Unknown') or []
-                    if offs:
-                        avg_dx = sum(o[0] for o in offs) / len(offs)
-                        avg_dy = sum(o[1] for o in offs) / len(offs)
-                        d['pos'].x = d['elem'].x + avg_dx
-                        d['pos'].y = d['elem'].y + avg_dy
+                    tag = d['tag']
+                    cat = tag.Category.Name if tag.Category else 'Unknown'
+                    avg = avgs.get(cat) or fallback
+                    if avg:
+                        d['pos'].x = d['elem'].x + avg[0]
+                        d['pos'].y = d['elem'].y + avg[1]
                         count += 1
                 except Exception:
                     pass
             return '{} tags repositioned from learned pattern'.format(count)
 
     class _S(object):
-        """Pure-Python SmartOrganizer. Each pass does actual layout work."""
+        """Pure-Python SmartOrganizer. Each pass does actual layout work.
+
+        Layout state is held as parallel lists (structure of arrays):
+        _px/_py tag heads, _ex/_ey host centres, _z head elevations, and
+        _loaded the tag for each index.
+        """
         PASSES = ['Analyse', 'Repulse', 'Attract', 'Physics', 'Anneal',
                   'Leaders', 'Polish', 'Score']
         def __init__(self, doc=None, view=None, spacing=0.25, iters=50, **k):
@@ -247,17 +548,29 @@ except Exception:
             self._view = view
             self._sp = float(spacing) if spacing else 0.25
             self._tags = []
-            self._data = []
-            self._orig = {}
+            self._loaded = []
+            self._px, self._py = [], []
+            self._ex, self._ey = [], []
+            self._z = []
+            self._rows = []             # _loaded index → _orig_xyz row
+            self._orig_xyz = array('d') # original heads, flat x, y, z per row
+            self._orig_row = {}         # tag id → row
 
         def load(self, tags):
             self._tags = list(tags)
-            self._data = []
-            self._orig = {}
+            self._loaded = []
+            self._px, self._py = [], []
+            self._ex, self._ey = [], []
+            self._z = []
+            self._rows = []
+            self._orig_xyz = xyz = array('d')
+            self._orig_row = {}
             for tag in tags:
                 try:
                     h = tag.TagHeadPosition
-                    self._orig[tag.Id.IntegerValue] = (h.X, h.Y, h.Z)
+                    row = len(xyz) // 3
+                    xyz.extend((h.X, h.Y, h.Z))
+                    self._orig_row[tag.Id.IntegerValue] = row
                     hosts = list(tag.GetTaggedLocalElements())
                     bb = hosts[0].get_BoundingBox(self._view) if hosts else None
                     if bb:
@@ -265,71 +578,86 @@ except Exception:
                         ey = (bb.Min.Y + bb.Max.Y) / 2
                     else:
                         ex, ey = h.X, h.Y
-                    self._data.append({
-                        'tag': tag, 'pos': Vec2(h.X, h.Y),
-                        'elem': Vec2(ex, ey), 'z': h.Z
-                    })
-                except Exception: pass
+                except Exception:
+                    continue
+                self._loaded.append(tag)
+                self._rows.append(row)
+                self._px.append(h.X); self._py.append(h.Y)
+                self._ex.append(ex);  self._ey.append(ey)
+                self._z.append(h.Z)
+
+        # ── Passes: each works on the coordinate lists in place.  Analysis
+        # passes return an overlap count for the status line.
+        def _relax(self, iters):
+            sp = self._sp
+            _force_kernel(self._px, self._py, None, None, sp, sp * 1.5, iters)
+
+        def _pass_repulse(self): self._relax(20)
+        def _pass_physics(self): self._relax(40)
+        def _pass_polish(self):  self._relax(10)
+
+        def _pass_attract(self):
+            px, py = self._px, self._py
+            ex, ey = self._ex, self._ey
+            max_ldr = self._sp * 3.0
+            sqrt    = math.sqrt
+            for i in range(len(px)):
+                lx = ex[i] - px[i]
+                ly = ey[i] - py[i]
+                ed = sqrt(lx*lx + ly*ly)
+                if ed > max_ldr:
+                    pull = (ed - max_ldr) / ed * 0.15
+                    px[i] += lx * pull; py[i] += ly * pull
+
+        def _pass_anneal(self):
+            SimAnneal(None, self._sp)._anneal(
+                self._px, self._py, self._ex, self._ey, 300)
+
+        def _pass_score(self):
+            px, py = self._px, self._py
+            sp  = self._sp
+            sp2 = sp * sp
+            return sum(1 for i, j in _grid_pairs(_build_grid(px, py, sp))
+                       if (px[i] - px[j]) ** 2 + (py[i] - py[j]) ** 2 < sp2)
+
+        # Pass name → implementation; names without an entry are no-ops
+        _DISPATCH = {
+            'Analyse': _pass_score,   'Repulse': _pass_repulse,
+            'Attract': _pass_attract, 'Physics': _pass_physics,
+            'Anneal':  _pass_anneal,  'Polish':  _pass_polish,
+            'Score':   _pass_score,
+        }
 
         def run_pass(self):
             self.pass_num += 1
             idx = min(self.pass_num - 1, len(self.PASSES) - 1)
             pname = self.PASSES[idx]
-            data = self._data
-            sp = self._sp
-            if not data:
+            if not self._px:
                 return 'Pass {}: no data'.format(self.pass_num)
-
-            if pname in ('Repulse', 'Physics', 'Polish'):
-                iters = {'Repulse': 20, 'Physics': 40, 'Polish': 10}.get(pname, 20)
-                for _ in range(iters):
-                    for i in range(len(data)):
-                        pi = data[i]['pos']
-                        fx = fy = 0.0
-                        for j in range(len(data)):
-                            if i == j: continue
-                            pj = data[j]['pos']
-                            dx = pi.x - pj.x; dy = pi.y - pj.y
-                            d = math.sqrt(dx*dx + dy*dy) or 1e-6
-                            if d < sp * 1.5:
-                                push = (sp - d) / d * 0.3
-                                fx += dx * push; fy += dy * push
-                        pi.x += fx; pi.y += fy
-            elif pname == 'Attract':
-                max_ldr = sp * 3.0
-                for d in data:
-                    ex = d['elem'].x - d['pos'].x
-                    ey = d['elem'].y - d['pos'].y
-                    ed = math.sqrt(ex*ex + ey*ey)
-                    if ed > max_ldr:
-                        pull = (ed - max_ldr) / ed * 0.15
-                        d['pos'].x += ex * pull; d['pos'].y += ey * pull
-            elif pname == 'Anneal':
-                SimAnneal(data, sp).run(300)
-            elif pname in ('Analyse', 'Score'):
-                overlaps = sum(1 for i in range(len(data))
-                               for j in range(i+1, len(data))
-                               if data[i]['pos'].dist(data[j]['pos']) < sp)
+            fn = self._DISPATCH.get(pname)
+            overlaps = fn(self) if fn else None
+            if overlaps is not None:
                 return 'Pass {}/{}: {} ({} overlaps, {} tags)'.format(
-                    self.pass_num, len(self.PASSES), pname, overlaps, len(data))
+                    self.pass_num, len(self.PASSES), pname, overlaps, len(self._px))
             return 'Pass {}/{}: {} ({} tags)'.format(
-                self.pass_num, len(self.PASSES), pname, len(data))
+                self.pass_num, len(self.PASSES), pname, len(self._px))
 
         def apply(self):
-            for d in self._data:
-                try: d['tag'].TagHeadPosition = XYZ(d['pos'].x, d['pos'].y, d['z'])
+            for tag, x, y, z in zip(self._loaded, self._px, self._py, self._z):
+                try: tag.TagHeadPosition = XYZ(x, y, z)
                 except Exception: pass
 
         def reset(self):
+            xyz = self._orig_xyz
             for t in self._tags:
                 try:
-                    orig = self._orig.get(t.Id.IntegerValue)
-                    if orig: t.TagHeadPosition = XYZ(*orig)
+                    row = self._orig_row.get(t.Id.IntegerValue)
+                    if row is not None:
+                        k = row * 3
+                        t.TagHeadPosition = XYZ(xyz[k], xyz[k + 1], xyz[k + 2])
                 except Exception: pass
-            for d in self._data:
-                orig = self._orig.get(d['tag'].Id.IntegerValue)
-                if orig:
-                    d['pos'].x = orig[0]; d['pos'].y = orig[1]
+            for i, row in enumerate(self._rows):
+                self._px[i] = xyz[row * 3]; self._py[i] = xyz[row * 3 + 1]
             self.pass_num = 0
         def run(self, *a, **k): return []
 
@@ -390,9 +718,10 @@ from Autodesk.Revit.DB import (
     DesignOption, Group, AssemblyInstance,
     BoundingBoxIntersectsFilter, Outline,
     WorksetKind, WorksetFilter,
-    SectionType, UnitUtils,
+    SectionType, UnitUtils, ElementMulticategoryFilter,
 )
-from Autodesk.Revit.UI import IExternalEventHandler, ExternalEvent
+from Autodesk.Revit.UI import (
+    IExternalEventHandler, ExternalEvent, ExternalEventRequest)
 
 # ── Revit version-safe imports (2023 vs 2024+ API changes) ────────────────
 try:
@@ -496,7 +825,7 @@ except ImportError:
     _REH = None
 
 try:
-    from collections import Counter, defaultdict
+    from collections import Counter, defaultdict, deque
 except ImportError:
     pass
 
@@ -509,6 +838,10 @@ import System
 import os
 import io
 import json
+try:
+    import ujson as _json_fast   # C parser when installed; stdlib otherwise
+except ImportError:
+    _json_fast = json
 import csv as _csv
 import tempfile
 import math as _m
@@ -527,22 +860,57 @@ _os = os
 # ExternalEvent handler — marshals modeless-panel actions to the Revit API thread
 # ─────────────────────────────────────────────────────────────────────────────
 class _RevitCallbackHandler(IExternalEventHandler):
-    """Runs an arbitrary Python callable on the Revit API thread."""
+    """Runs queued Python callables on the Revit API thread.
+    Clicks arriving before the event fires share one Raise/Execute hop."""
     def __init__(self):
-        self._fn = None        # callable queued by the WPF click wrapper
+        self._queue = deque()  # (key, callable) queued by the WPF wrappers
+        self._keys = set()     # keys of queued, not yet run, callables
+        self._pending = False  # True while a Raise() is outstanding
         self._panel = None     # back-ref for error logging
-    def Execute(self, uiapp):
-        fn = self._fn
-        self._fn = None
-        if fn:
+    def post(self, fn, evt, key=None):
+        """Queue fn; raise evt only if no drain is already pending.
+        A keyed fn is dropped while one with the same key is still queued
+        (key repeats, repeated Esc), so a burst runs once."""
+        if key is not None:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+        self._queue.append((key, fn))
+        if not self._pending:
+            self._pending = True
             try:
-                fn()
-            except Exception as ex:
+                res = evt.Raise()
+            except Exception:
+                res = None
+            # Denied / TimedOut don't throw, and Execute will never run
+            # to reset the flag: drop what is stranded so the next click
+            # raises afresh instead of queueing behind it for ever
+            if res != ExternalEventRequest.Accepted \
+                    and res != ExternalEventRequest.Pending:
+                self._pending = False
+                self._keys.clear()
+                self._queue.clear()
+    def Execute(self, uiapp):
+        q = self._queue
+        try:
+            while q:
+                key, fn = q.popleft()
+                self._keys.discard(key)
                 try:
-                    if self._panel:
-                        self._panel._log(str(ex), '!')
-                except Exception:
-                    pass
+                    fn()
+                except Exception as ex:
+                    try:
+                        if self._panel:
+                            self._panel._log(str(ex), '!')
+                    except Exception:
+                        pass
+        finally:
+            self._pending = False
+            try:
+                if self._panel:
+                    self._panel._needs_poll = True
+            except Exception:
+                pass
     def GetName(self):
         return 'STINGTagsCallback'
 
@@ -598,12 +966,76 @@ _MEP_BICS_NAMES = [
     'OST_FireAlarmDevices', 'OST_CommunicationDevices', 'OST_DataDevices',
     'OST_NurseCallDevices', 'OST_SecurityDevices', 'OST_TelephoneDevices',
 ]
-_MEP_BICS = []
-for _bname in _MEP_BICS_NAMES:
+_BIC_CACHE = {}
+def _bic(name):
+    """BuiltInCategory member by name, or None if this Revit lacks it (cached)."""
     try:
-        _MEP_BICS.append(getattr(BuiltInCategory, _bname))
-    except AttributeError:
-        pass
+        return _BIC_CACHE[name]
+    except KeyError:
+        bic = _BIC_CACHE[name] = getattr(BuiltInCategory, name, None)
+        return bic
+
+# Tuple keeps collector order stable; the id set gives O(1) category tests
+_MEP_BICS = tuple(b for b in (_bic(n) for n in _MEP_BICS_NAMES) if b is not None)
+_MEP_BIC_IDS = frozenset(int(b) for b in _MEP_BICS)
+
+# Tag By Category choices: (label, BuiltInCategory member name)
+_TAG_BY_CAT_NAMES = (
+    ('Lighting Fixtures',    'OST_LightingFixtures'),
+    ('Electrical Equipment', 'OST_ElectricalEquipment'),
+    ('Electrical Fixtures',  'OST_ElectricalFixtures'),
+    ('Mechanical Equipment', 'OST_MechanicalEquipment'),
+    ('Plumbing Fixtures',    'OST_PlumbingFixtures'),
+    ('Air Terminals',        'OST_DuctTerminal'),
+    ('Furniture',            'OST_Furniture'),
+    ('Doors',                'OST_Doors'),
+    ('Windows',              'OST_Windows'),
+    ('Sprinklers',           'OST_Sprinklers'),
+    ('Pipes',                'OST_PipeCurves'),
+    ('Pipe Fittings',        'OST_PipeFitting'),
+    ('Pipe Accessories',     'OST_PipeAccessory'),
+    ('Ducts',                'OST_DuctCurves'),
+    ('Duct Fittings',        'OST_DuctFitting'),
+    ('Duct Accessories',     'OST_DuctAccessory'),
+    ('Conduit',              'OST_Conduit'),
+    ('Conduit Fittings',     'OST_ConduitFitting'),
+    ('Cable Trays',          'OST_CableTray'),
+    ('Cable Tray Fittings',  'OST_CableTrayFitting'),
+    ('Flex Ducts',           'OST_FlexDuctCurves'),
+    ('Flex Pipes',           'OST_FlexPipeCurves'),
+    ('Generic Models',       'OST_GenericModel'),
+    ('Specialty Equipment',  'OST_SpecialityEquipment'),
+    ('Fire Alarm Devices',   'OST_FireAlarmDevices'),
+    ('Communication Devices','OST_CommunicationDevices'),
+    ('Rooms',                'OST_Rooms'),
+    ('Walls',                'OST_Walls'),
+    ('Floors',               'OST_Floors'),
+    ('Ceilings',             'OST_Ceilings'),
+    ('Structural Columns',   'OST_StructuralColumns'),
+    ('Structural Framing',   'OST_StructuralFraming'),
+)
+# Resolved once at load; members this Revit lacks drop out
+_TAG_BY_CAT_BICS = tuple((label, _bic(n)) for label, n in _TAG_BY_CAT_NAMES
+                         if _bic(n) is not None)
+
+_MEP_FILTER = [None]   # ElementMulticategoryFilter over _MEP_BICS, lazily
+_TAG_BY_CAT_FILTER = [None]   # …and over _TAG_BY_CAT_BICS
+
+
+def _mep_filter():
+    """One native filter for every MEP category, built on first use."""
+    if _MEP_FILTER[0] is None:
+        _MEP_FILTER[0] = ElementMulticategoryFilter(
+            List[BuiltInCategory](_MEP_BICS))
+    return _MEP_FILTER[0]
+
+
+def _tag_by_cat_filter():
+    """Native filter for every Tag By Category choice, built on first use."""
+    if _TAG_BY_CAT_FILTER[0] is None:
+        _TAG_BY_CAT_FILTER[0] = ElementMulticategoryFilter(
+            List[BuiltInCategory]([b for _, b in _TAG_BY_CAT_BICS]))
+    return _TAG_BY_CAT_FILTER[0]
 _BIC_MAP = {
     'lights':    BuiltInCategory.OST_LightingFixtures,
     'elec':      BuiltInCategory.OST_ElectricalEquipment,
@@ -673,40 +1105,298 @@ def _fresh():
         return None, None
 
 
+# Host lookups, bounding boxes and parameter definitions memoised for the
+# duration of one operation.  Hosts do not move while tags are being
+# arranged, but each lookup costs one or more API round trips per tag, and
+# handlers ask for the same tag or parameter many times.  Cleared by
+# _clear_op_caches() before every handler and on view change, so entries
+# never outlive the operation that made them.  The exceptions are
+# _LIVE_CACHES below: while the panel holds a DocumentChanged subscription
+# they are cleared on every model change (and document switch) instead, so
+# they carry over from one click to the next.  Per-view element sets are
+# not kept for views under temporary hide/isolate, which changes what a
+# view shows without a model change.
+_HOST_CENTER_CACHE = {}   # (view id, tag id) → XYZ or None
+_TAGGED_REF_CACHE  = {}   # tag id → Reference or None
+_BB_CENTER_CACHE   = {}   # (element id, view id) → XYZ or None
+_PARAM_DEF_CACHE   = {}   # (category id, parameter name) → Definition
+_TAGGED_HOSTS      = {}   # view id → frozenset of tagged host ids
+_BB_CACHE_LIVE     = [False]   # True while DocumentChanged clears them
+_COLLECT_CACHE     = {}   # (view id, BuiltInCategory or None) → elements
+_VIEW_CENTRES      = {}   # view id → (elements, xs, ys, {cell: grid})
+_CAT_NAME_CACHE    = {}   # element id → category name ('' if none)
+_VIEW_CATS         = {}   # view id → {category name: [elements]}
+_FALLBACK_SYMS     = {}   # doc hash → {tag category name: symbol id}
+_VIEW_TAGS         = {}   # view id → IndependentTags in the view
+_LIVE_CACHES = (_BB_CENTER_CACHE, _TAGGED_HOSTS, _COLLECT_CACHE,
+                _VIEW_CENTRES, _CAT_NAME_CACHE, _VIEW_CATS, _FALLBACK_SYMS,
+                _VIEW_TAGS)
+
+
+def _clear_op_caches():
+    _HOST_CENTER_CACHE.clear()
+    _TAGGED_REF_CACHE.clear()
+    if not _BB_CACHE_LIVE[0]:
+        for cache in _LIVE_CACHES:
+            cache.clear()
+    _PARAM_DEF_CACHE.clear()
+
+
+def _view_key(view):
+    """Cache key for the view's element sets, or None when they must be
+    rebuilt on every call: inside an open transaction (DocumentChanged only
+    fires on commit) or under temporary hide/isolate on a live cache."""
+    try:
+        if view.Document.IsModifiable:
+            return None
+        if _BB_CACHE_LIVE[0] and view.IsTemporaryHideIsolateActive():
+            return None
+    except Exception:
+        pass
+    return view.Id.IntegerValue
+
+
+def _view_elems(doc, view, bic=None):
+    """Non-type elements in view, optionally of one category, collected
+    once and shared.  A tuple, since every caller shares it; built by
+    iterating the collector, not via an intermediate ToElements() list."""
+    vk = _view_key(view)
+    store = _COLLECT_CACHE if vk is not None else {}
+    key = (vk, bic)
+    hit = store.get(key)
+    if hit is None:
+        col = FilteredElementCollector(doc, view.Id)
+        if bic is not None:
+            col = col.OfCategory(bic)
+        hit = store[key] = tuple(col.WhereElementIsNotElementType())
+    return hit
+
+
+def _cat_name(el):
+    """el.Category.Name, or '' when uncategorised; memoised per element."""
+    k = el.Id.IntegerValue
+    v = _CAT_NAME_CACHE.get(k)
+    if v is None:
+        cat = el.Category
+        v = _CAT_NAME_CACHE[k] = (cat.Name or '') if cat else ''
+    return v
+
+
+def _view_cats(doc, view):
+    """The view's elements grouped by category name, skipping unnamed
+    and '<…>' system categories; built once per view."""
+    key = _view_key(view)
+    cats = _VIEW_CATS.get(key) if key is not None else None
+    if cats is None:
+        cats = {}
+        for el in _view_elems(doc, view):
+            name = _cat_name(el)
+            if name and not name.startswith('<'):
+                cats.setdefault(name, []).append(el)
+        if key is not None:
+            _VIEW_CATS[key] = cats
+    return cats
+
+
+def _tag_fallback_syms(doc):
+    """First active symbol of each annotation '…Tag…' category, by category
+    name.  The categories are picked from doc.Settings so the collector
+    returns tag symbols only; the map is kept until the next model change."""
+    key = doc.GetHashCode()
+    syms = _FALLBACK_SYMS.get(key)
+    if syms is None:
+        syms = {}
+        ids = List[ElementId]()
+        for cat in doc.Settings.Categories:
+            try:
+                if cat.CategoryType == _CT_ANNOTATION \
+                        and 'Tag' in cat.Name:
+                    ids.Add(cat.Id)
+            except Exception:
+                pass
+        if ids.Count:
+            for sym in FilteredElementCollector(doc).OfClass(FamilySymbol) \
+                    .WherePasses(ElementMulticategoryFilter(ids)):
+                try:
+                    if sym.IsActive:
+                        syms.setdefault(sym.Category.Name, sym.Id)
+                except Exception:
+                    pass
+        _FALLBACK_SYMS[key] = syms
+    return syms
+
+
+def _view_mep_elems(doc, view):
+    """MEP elements in view from one multicategory collector pass,
+    cached like _view_elems."""
+    vk = _view_key(view)
+    store = _COLLECT_CACHE if vk is not None else {}
+    key = (vk, 'MEP')
+    hit = store.get(key)
+    if hit is None:
+        hit = store[key] = tuple(
+            FilteredElementCollector(doc, view.Id).WherePasses(_mep_filter())
+            .WhereElementIsNotElementType())
+    return hit
+
+
+def _crop_outline(view):
+    """Model-space Outline around the view's active crop box, or None.
+    The crop depth is left open: the view collector already applies the
+    view range, and only the crop rectangle is wanted here."""
+    try:
+        if not view.CropBoxActive:
+            return None
+        cb = view.CropBox
+        to_model = cb.Transform.OfPoint
+        pts = [to_model(XYZ(x, y, z))
+               for x in (cb.Min.X, cb.Max.X)
+               for y in (cb.Min.Y, cb.Max.Y)
+               for z in (-1e6, 1e6)]
+        return Outline(XYZ(min(p.X for p in pts), min(p.Y for p in pts),
+                           min(p.Z for p in pts)),
+                       XYZ(max(p.X for p in pts), max(p.Y for p in pts),
+                           max(p.Z for p in pts)))
+    except Exception:
+        return None
+
+
 def _bb_center(elem, view):
+    """Bounding-box centre of elem in view, memoised per (element, view)
+    until the next _clear_op_caches() or model change."""
+    try:
+        key = (elem.Id.IntegerValue, view.Id.IntegerValue if view else None)
+        return _BB_CENTER_CACHE[key]
+    except KeyError:
+        pass
+    except Exception:
+        key = None
+    c = None
     try:
         bb = elem.get_BoundingBox(view)
         if bb:
-            return XYZ((bb.Min.X + bb.Max.X) / 2,
-                       (bb.Min.Y + bb.Max.Y) / 2,
-                       (bb.Min.Z + bb.Max.Z) / 2)
+            c = XYZ((bb.Min.X + bb.Max.X) / 2,
+                    (bb.Min.Y + bb.Max.Y) / 2,
+                    (bb.Min.Z + bb.Max.Z) / 2)
     except Exception:
         pass
-    return None
+    if key is not None:
+        _BB_CENTER_CACHE[key] = c
+    return c
+
+
+def _view_centres(doc, view):
+    """(elements, xs, ys, grids) for the view's elements that have a
+    centre, read once and shared by every spatial handler.  grids holds
+    one _build_grid bucketing per cell size; treat all four as read-only."""
+    key = _view_key(view)
+    store = _VIEW_CENTRES if key is not None else {}
+    hit = store.get(key)
+    if hit is None:
+        els, xs, ys = [], array('d'), array('d')
+        for el in _view_elems(doc, view):
+            c = _bb_center(el, view)
+            if c:
+                els.append(el); xs.append(c.X); ys.append(c.Y)
+        hit = store[key] = (tuple(els), xs, ys, {})
+    return hit
+
+
+def _view_grid(doc, view, cell):
+    """The view's centres bucketed at `cell`, built once per cell size."""
+    els, xs, ys, grids = _view_centres(doc, view)
+    grid = grids.get(cell)
+    if grid is None:
+        grid = grids[cell] = _build_grid(xs, ys, cell)
+    return grid
+
+
+def _iter_view_tags(doc, view):
+    """Yield the view's tags: from the _view_tags cache when it holds the
+    view, otherwise straight from the collector without building a list.
+    Only for read-only loops — don't modify the document while the
+    collector is being iterated."""
+    try:
+        hit = _VIEW_TAGS.get(_view_key(view))
+        if hit is None:
+            hit = FilteredElementCollector(doc, view.Id).OfClass(IndependentTag)
+    except Exception:
+        return
+    for t in hit:
+        yield t
+
+
+def _tagged_host_ids(doc, view):
+    """Ids of the elements tagged in view, as a frozenset of ints.
+    Read through the id API so no host elements are materialised."""
+    key = _view_key(view)
+    hit = _TAGGED_HOSTS.get(key) if key is not None else None
+    if hit is None:
+        ids = set()
+        add = ids.add
+        for t in _iter_view_tags(doc, view):
+            try:
+                if _TAG_API_REFS:
+                    for i in t.GetTaggedLocalElementIds(): add(i.IntegerValue)
+                else:
+                    add(t.TaggedLocalElementId.IntegerValue)
+            except Exception:
+                pass
+        ids.discard(-1)   # InvalidElementId from unhosted tags
+        hit = frozenset(ids)
+        if key is not None:
+            _TAGGED_HOSTS[key] = hit
+    return hit
 
 
 def _view_tags(doc, view):
+    """The view's tags as a fresh list, collected once and kept with the
+    other live caches until the next model change."""
     try:
-        return list(FilteredElementCollector(doc, view.Id)
-                    .OfClass(IndependentTag).ToElements())
+        key = _view_key(view)
+        hit = _VIEW_TAGS.get(key) if key is not None else None
+        if hit is None:
+            hit = tuple(FilteredElementCollector(doc, view.Id)
+                        .OfClass(IndependentTag))
+            if key is not None:
+                _VIEW_TAGS[key] = hit
+        return list(hit)
     except Exception:
         return []
 
 
+def _iter_sel(doc, uidoc):
+    """Yield the selected elements, resolving each id once."""
+    get = doc.GetElement
+    for eid in uidoc.Selection.GetElementIds():
+        yield get(eid)
+
+
 def _sel_tags(doc, uidoc):
-    return [doc.GetElement(eid) for eid in uidoc.Selection.GetElementIds()
-            if isinstance(doc.GetElement(eid), IndependentTag)]
+    return [el for el in _iter_sel(doc, uidoc) if isinstance(el, IndependentTag)]
 
 
 def _sel_elems(doc, uidoc):
-    return [doc.GetElement(eid) for eid in uidoc.Selection.GetElementIds()
-            if doc.GetElement(eid) is not None
-            and not isinstance(doc.GetElement(eid), IndependentTag)]
+    return [el for el in _iter_sel(doc, uidoc)
+            if el is not None and not isinstance(el, IndependentTag)]
 
 
 def _get_host_center(tag, view):
     """Get the center of a tag's host element. Returns XYZ or None.
-    Tries four methods to find the host element."""
+    Memoised per view and tag until the next _clear_op_caches()."""
+    try:
+        key = (view.Id.IntegerValue if view else None, tag.Id.IntegerValue)
+    except Exception:
+        return _resolve_host_center(tag, view)
+    try:
+        return _HOST_CENTER_CACHE[key]
+    except KeyError:
+        c = _HOST_CENTER_CACHE[key] = _resolve_host_center(tag, view)
+        return c
+
+
+def _resolve_host_center(tag, view):
+    """Tries four methods to find the host element, then its centre."""
     elem = None
     # Method 1: GetTaggedLocalElements (Revit 2022+)
     try:
@@ -748,36 +1438,44 @@ def _get_host_center(tag, view):
 
 
 def _get_tagged_ref(tag):
-    """Get a single Reference to the tagged element.
-    Returns Reference or None. Tries multiple API paths."""
-    # Method 1: GetTaggedReferences (Revit 2022+ ISet<Reference>)
+    """Get a single Reference to the tagged element. Returns Reference or None.
+    Memoised per tag until the next _clear_op_caches()."""
     try:
-        refs = tag.GetTaggedReferences()
-        # IronPython: iterate ISet
-        for r in refs:
-            return r
+        key = tag.Id.IntegerValue
     except Exception:
-        pass
-    # Method 2: Build Reference from tagged element
+        return _resolve_tagged_ref(tag)
     try:
-        hosts = list(tag.GetTaggedLocalElements())
-        if hosts:
-            return Reference(hosts[0])
-    except Exception:
-        pass
+        return _TAGGED_REF_CACHE[key]
+    except KeyError:
+        ref = _TAGGED_REF_CACHE[key] = _resolve_tagged_ref(tag)
+        return ref
+
+
+def _resolve_tagged_ref(tag):
+    """Tries the API paths this Revit version offers for a Reference to the
+    tagged element."""
+    # Method 1: GetTaggedReferences (Revit 2022+ ISet<Reference>)
+    if _TAG_API_REFS:
+        try:
+            for r in tag.GetTaggedReferences():
+                return r
+        except Exception:
+            pass
+    # Method 2: Build Reference from tagged element
     try:
-        host = tag.GetTaggedLocalElement()
-        if host:
-            return Reference(host)
+        if _TAG_API_REFS:
+            for host in tag.GetTaggedLocalElements():
+                return Reference(host)
+        else:
+            host = tag.GetTaggedLocalElement()
+            if host:
+                return Reference(host)
     except Exception:
         pass
     # Method 3: From TaggedElementId
     try:
         teid = tag.TaggedElementId
-        try:
-            eid = teid.HostElementId
-        except Exception:
-            eid = teid
+        eid = getattr(teid, 'HostElementId', teid)   # LinkElementId or ElementId
         if eid and eid != ElementId.InvalidElementId:
             elem = tag.Document.GetElement(eid)
             if elem:
@@ -787,90 +1485,111 @@ def _get_tagged_ref(tag):
     return None
 
 
-def _get_elbow(tag):
-    """Safely read leader elbow position. Returns XYZ or None."""
+# Leader API generation, probed once at import instead of discovered by
+# catching exceptions on every call.  Revit 2022+ addresses leader points by
+# the tagged Reference; older versions expose LeaderElbow / LeaderEnd
+# properties (still present, obsolete, on early multi-reference releases).
+# Where both exist, a Reference call that raises falls back to the property.
+_TAG_API_REFS   = hasattr(IndependentTag, 'GetTaggedReferences')
+_LEADER_API_REF = hasattr(IndependentTag, 'GetLeaderEnd')
+_LEADER_API_OLD = hasattr(IndependentTag, 'LeaderEnd')
+
+
+def _get_elbow(tag, ref=None):
+    """Safely read leader elbow position. Returns XYZ or None.
+    ref: the tagged Reference, if the caller already resolved it."""
     if not tag.HasLeader:
         return None
-    # Method 1: Revit 2022+ SetLeaderElbow/GetLeaderElbow(Reference)
-    ref = _get_tagged_ref(tag)
-    if ref:
+    # Method 1: Revit 2022+ GetLeaderElbow(Reference)
+    if _LEADER_API_REF:
+        if ref is None:
+            ref = _get_tagged_ref(tag)
+        if ref:
+            try:
+                return tag.GetLeaderElbow(ref)
+            except Exception:
+                # No elbow, or a rebuilt host Reference the API rejects;
+                # 2022/2023 still have the legacy property to fall back on
+                pass
+    # Method 2: Legacy property
+    if _LEADER_API_OLD:
         try:
-            eb = tag.GetLeaderElbow(ref)
-            if eb is not None:
-                return eb
+            return tag.LeaderElbow
         except Exception:
             pass
-    # Method 2: Legacy property
-    try:
-        eb = tag.LeaderElbow
-        if eb is not None:
-            return eb
-    except Exception:
-        pass
     return None
 
 
-def _set_elbow(tag, xyz):
+def _set_elbow(tag, xyz, ref=None):
     """Safely set leader elbow position. Returns True on success.
-    Tries Reference-based API first (Revit 2022+), then legacy."""
+    Uses the Reference-based API (Revit 2022+) where present, else legacy."""
     if not tag.HasLeader:
         try:
             tag.HasLeader = True
         except Exception:
             return False
     # Method 1: Revit 2022+ SetLeaderElbow(Reference, XYZ)
-    ref = _get_tagged_ref(tag)
-    if ref:
+    if _LEADER_API_REF:
+        if ref is None:
+            ref = _get_tagged_ref(tag)
+        if ref:
+            try:
+                tag.SetLeaderElbow(ref, xyz)
+                return True
+            except Exception:
+                pass
+    # Method 2: Legacy property
+    if _LEADER_API_OLD:
         try:
-            tag.SetLeaderElbow(ref, xyz)
+            tag.LeaderElbow = xyz
             return True
         except Exception:
             pass
-    # Method 2: Legacy property
-    try:
-        tag.LeaderElbow = xyz
-        return True
-    except Exception:
-        pass
     return False
 
 
-def _get_leader_end(tag):
+def _get_leader_end(tag, ref=None):
     """Get the leader end point. Returns XYZ or None."""
     if not tag.HasLeader:
         return None
-    ref = _get_tagged_ref(tag)
-    if ref:
+    if _LEADER_API_REF:
+        if ref is None:
+            ref = _get_tagged_ref(tag)
+        if ref:
+            try:
+                return tag.GetLeaderEnd(ref)
+            except Exception:
+                pass
+    if _LEADER_API_OLD:
         try:
-            return tag.GetLeaderEnd(ref)
+            return tag.LeaderEnd
         except Exception:
             pass
-    try:
-        return tag.LeaderEnd
-    except Exception:
-        pass
     return None
 
 
-def _set_leader_end(tag, xyz):
+def _set_leader_end(tag, xyz, ref=None):
     """Set leader end point. Returns True on success."""
     if not tag.HasLeader:
         try:
             tag.HasLeader = True
         except Exception:
             return False
-    ref = _get_tagged_ref(tag)
-    if ref:
+    if _LEADER_API_REF:
+        if ref is None:
+            ref = _get_tagged_ref(tag)
+        if ref:
+            try:
+                tag.SetLeaderEnd(ref, xyz)
+                return True
+            except Exception:
+                pass
+    if _LEADER_API_OLD:
         try:
-            tag.SetLeaderEnd(ref, xyz)
+            tag.LeaderEnd = xyz
             return True
         except Exception:
             pass
-    try:
-        tag.LeaderEnd = xyz
-        return True
-    except Exception:
-        pass
     return False
 
 
@@ -878,20 +1597,21 @@ def _make_leader_straight(tag, view):
     """Remove elbow bend by placing it co-linear on the leader."""
     try:
         h = tag.TagHeadPosition
+        ref = _get_tagged_ref(tag) if _LEADER_API_REF else None
         end = _get_host_center(tag, view)
         if not end:
-            end = _get_leader_end(tag)
+            end = _get_leader_end(tag, ref)
         if not end:
             return False
         frac = 1.0 / 3.0
         mid = XYZ(h.X + (end.X - h.X) * frac,
                   h.Y + (end.Y - h.Y) * frac, h.Z)
-        return _set_elbow(tag, mid)
+        return _set_elbow(tag, mid, ref)
     except Exception:
         return False
 
 
-def _create_elbow_at_midpoint(tag, view, perp_fraction=0.25):
+def _create_elbow_at_midpoint(tag, view, perp_fraction=0.25, ref=None):
     """Create an elbow at the perpendicular midpoint between tag and host.
     Returns the elbow XYZ on success, None on failure."""
     if not tag.HasLeader:
@@ -905,15 +1625,14 @@ def _create_elbow_at_midpoint(tag, view, perp_fraction=0.25):
     h = tag.TagHeadPosition
     dx = h.X - c.X
     dy = h.Y - c.Y
-    dist = math.sqrt(dx * dx + dy * dy)
-    if dist < 0.01:
+    if dx * dx + dy * dy < 0.0001:
         return None
     mx = (h.X + c.X) / 2
     my = (h.Y + c.Y) / 2
-    perp = dist * perp_fraction
-    elbow_pt = XYZ(mx + (-dy / dist) * perp,
-                   my + (dx / dist) * perp, h.Z)
-    if _set_elbow(tag, elbow_pt):
+    # Offset = unit perpendicular * (dist * perp_fraction); dist cancels out
+    elbow_pt = XYZ(mx - dy * perp_fraction,
+                   my + dx * perp_fraction, h.Z)
+    if _set_elbow(tag, elbow_pt, ref):
         return elbow_pt
     return None
 
@@ -932,29 +1651,158 @@ def _add_multi_leader(tag, doc, view):
 
 
 def _set_ids(uidoc, elems):
-    uidoc.Selection.SetElementIds(List[ElementId]([e.Id for e in elems]))
-    return len(elems)
+    # Fill a pre-sized typed list directly — no intermediate Python list
+    n = len(elems)
+    ids = List[ElementId](n)
+    add = ids.Add
+    for e in elems:
+        add(e.Id)
+    uidoc.Selection.SetElementIds(ids)
+    return n
+
+
+def _sel_int_ids(uidoc):
+    """Current selection as a set of ElementId integer values."""
+    return set(eid.IntegerValue for eid in uidoc.Selection.GetElementIds())
+
+
+def _set_int_ids(uidoc, ints):
+    """Select elements by integer id, wrapping each in an ElementId once."""
+    n = len(ints)
+    ids = List[ElementId](n)
+    add = ids.Add
+    for i in ints:
+        add(ElementId(i))
+    uidoc.Selection.SetElementIds(ids)
+    return n
+
+
+class _TagArrays(object):
+    """Struct-of-arrays tag geometry: parallel columns, one row per tag.
+    tx/ty/z — tag head; ex/ey — host centre (the head itself if unhosted)."""
+    __slots__ = ['tags', 'tx', 'ty', 'ex', 'ey', 'z']
+    def __init__(self):
+        self.tags = []
+        self.tx, self.ty = array('d'), array('d')
+        self.ex, self.ey = array('d'), array('d')
+        self.z = array('d')
+    def __len__(self): return len(self.tags)
+
+
+def _first_host_id(tag):
+    """ElementId of the tag's first local host, or None."""
+    if _TAG_API_REFS:
+        for hid in tag.GetTaggedLocalElementIds():
+            return hid
+        return None
+    return tag.TaggedLocalElementId
+
+
+def _prefetch_bb_centers(view, ids):
+    """Fill _BB_CENTER_CACHE for ids not cached yet, fetching the elements
+    through one id-set collector rather than one lookup per tag."""
+    vid = view.Id.IntegerValue
+    need, seen = List[ElementId](), set()
+    for i in ids:
+        k = i.IntegerValue
+        if k not in seen and (k, vid) not in _BB_CENTER_CACHE:
+            seen.add(k)
+            need.Add(i)
+    if need.Count == 0:
+        return
+    try:
+        for el in FilteredElementCollector(view.Document, need) \
+                .WhereElementIsNotElementType():
+            _bb_center(el, view)
+    except Exception:
+        pass
 
 
-def _tag_data(tags, view):
-    data = []
-    for tag in tags:
+def _tag_arrays(tags, view):
+    """Gather tag heads and host centres into a _TagArrays.  Host ids are
+    read first so every host box is resolved in one batch."""
+    a = _TagArrays()
+    rows = []
+    it = iter(tags)
+    # One try around the whole loop rather than one per tag: a tag that
+    # raises is skipped and the loop resumes from the shared iterator.
+    while True:
         try:
-            h = tag.TagHeadPosition
-            hosts = list(tag.GetTaggedLocalElements())
-            bb = hosts[0].get_BoundingBox(view) if hosts else None
-            ep = Vec2((bb.Min.X + bb.Max.X) / 2,
-                      (bb.Min.Y + bb.Max.Y) / 2) if bb else Vec2(h.X, h.Y)
-            data.append({'tag': tag, 'pos': Vec2(h.X, h.Y), 'elem': ep, 'z': h.Z})
+            for tag in it:
+                rows.append((tag, tag.TagHeadPosition, _first_host_id(tag)))
+            break
         except Exception:
-            pass
-    return data
+            continue
+    vid = None
+    if view is not None:
+        vid = view.Id.IntegerValue
+        _prefetch_bb_centers(view, [r[2] for r in rows if r[2] is not None])
+    cache = _BB_CENTER_CACHE
+    for tag, h, hid in rows:
+        c = None
+        if hid is not None:
+            key = (hid.IntegerValue, vid)
+            if key in cache:
+                c = cache[key]
+            else:
+                # Not reached by the batch (e.g. the collector refused it)
+                try:
+                    host = tag.Document.GetElement(hid)
+                    c = _bb_center(host, view) if host else None
+                except Exception:
+                    c = None
+        hx, hy = (c.X, c.Y) if c else (h.X, h.Y)
+        a.tags.append(tag)
+        a.tx.append(h.X); a.ty.append(h.Y)
+        a.ex.append(hx);  a.ey.append(hy)
+        a.z.append(h.Z)
+    return a
+
+
+def _tag_data(tags, view):
+    """Dict-per-tag form of _tag_arrays — what the layout engines take."""
+    a = _tag_arrays(tags, view)
+    return [{'tag': t, 'pos': Vec2(x, y), 'elem': Vec2(hx, hy), 'z': z}
+            for t, x, y, hx, hy, z in zip(a.tags, a.tx, a.ty, a.ex, a.ey, a.z)]
+
+
+def _write_positions(data, prev, eps=1e-6):
+    """Move each tag to its d['pos'], skipping tags the optimiser left in
+    place.  prev is the tag id → (x, y, z) snapshot from _push_undo; an XYZ
+    is only built, and TagHeadPosition only set, for tags that moved."""
+    moved = 0
+    for d in data:
+        p = d['pos']
+        old = prev.get(d['tag'].Id.IntegerValue) if prev else None
+        if old is not None and abs(old[0] - p.x) < eps \
+                and abs(old[1] - p.y) < eps:
+            continue
+        d['tag'].TagHeadPosition = XYZ(p.x, p.y, d['z'])
+        moved += 1
+    return moved
+
+
+def _param_by_name(el, pname):
+    """el.LookupParameter(pname), but LookupParameter scans every parameter
+    by name.  The Definition it finds is cached per category and reused via
+    get_Parameter (a keyed lookup) for the rest of the operation; elements
+    whose parameter has a different Definition fall back to the scan."""
+    cat = el.Category
+    key = (cat.Id.IntegerValue if cat else None, pname)
+    defn = _PARAM_DEF_CACHE.get(key)
+    if defn is not None:
+        p = el.get_Parameter(defn)
+        if p is not None:
+            return p
+    p = el.LookupParameter(pname)
+    if p is not None:
+        _PARAM_DEF_CACHE[key] = p.Definition
+    return p
 
 
 def _iso_get(el, pname):
     try:
-        from Autodesk.Revit.DB import StorageType
-        p = el.LookupParameter(pname)
+        p = _param_by_name(el, pname)
         if p and p.StorageType == StorageType.String:
             return p.AsString() or ''
     except Exception:
@@ -964,10 +1812,9 @@ def _iso_get(el, pname):
 
 def _iso_set(el, pname, val, overwrite=False):
     try:
-        from Autodesk.Revit.DB import StorageType
-        p = el.LookupParameter(pname)
+        p = _param_by_name(el, pname)
         if p and not p.IsReadOnly and p.StorageType == StorageType.String:
-            if overwrite or not _iso_get(el, pname):
+            if overwrite or not p.AsString():
                 p.Set(val)
                 return True
     except Exception:
@@ -975,11 +1822,30 @@ def _iso_set(el, pname, val, overwrite=False):
     return False
 
 
+_UI_PENDING = deque()    # UI callbacks waiting for the next drain
+_UI_POSTED  = [False]    # True while a drain is queued on the dispatcher
+_UI_DISP    = [None]     # panel's Dispatcher, bound once in __init__
+_UI_BG      = DispatcherPriority.Background
+
+
+def _drain_ui(_pending=_UI_PENDING, _posted=_UI_POSTED):
+    # Names bound as defaults: dispatcher callbacks lose module globals
+    _posted[0] = False
+    while _pending:
+        fn = _pending.popleft()
+        try:
+            fn()
+        except Exception:
+            pass
+
+
 def _dispatch_ui(fn):
-    """Run fn on the WPF dispatcher so mid-loop log updates paint immediately."""
+    """Run fn on the WPF dispatcher so mid-loop log updates paint immediately.
+    Synchronous: handlers run on the UI thread, so anything posted would
+    only run after the handler returns.  Loops throttle their own calls."""
     try:
-        Dispatcher.CurrentDispatcher.Invoke(DispatcherPriority.Background,
-                                             System.Action(fn))
+        disp = _UI_DISP[0] or Dispatcher.CurrentDispatcher
+        disp.Invoke(_UI_BG, System.Action(fn))
     except Exception:
         try:
             fn()
@@ -987,11 +1853,85 @@ def _dispatch_ui(fn):
             pass
 
 
+def _defer_ui(fn):
+    """Queue fn to run once the current handler has returned.  Callbacks
+    queued while a drain is already posted ride along with it.  For
+    deferred work only, never progress: a queued log would land after,
+    and overwrite, the handler's final message."""
+    _UI_PENDING.append(fn)
+    if _UI_POSTED[0]:
+        return
+    try:
+        disp = _UI_DISP[0] or Dispatcher.CurrentDispatcher
+        disp.BeginInvoke(_UI_BG, _UI_DRAIN_ACTION)
+        _UI_POSTED[0] = True
+    except Exception:
+        _drain_ui()
+
+
+_UI_DRAIN_ACTION = System.Action(_drain_ui)   # one delegate for every post
+
+
+# AutoSpace estimates the median tag spacing from at most this many tags
+# (about 80k pairs)
+_AUTOSPACE_SAMPLE = 400
+
+
+def _pause_sel_timer(fn):
+    """Handler decorator: hold the selection poll while a bulk selector
+    runs, so no tick queues up behind it to re-read the selection it is
+    still replacing.  Restarting also resets the interval."""
+    def wrapper(self, *args):
+        timer = getattr(self, '_sel_timer', None)
+        running = timer is not None and timer.IsEnabled
+        if running:
+            timer.Stop()
+        try:
+            return fn(self, *args)
+        finally:
+            if running:
+                timer.Start()
+    wrapper.__name__ = fn.__name__
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+# Enum members resolved once rather than on every call
+_BIP_PHASE_CREATED = BuiltInParameter.PHASE_CREATED
+_BIP_DESIGN_OPTION = BuiltInParameter.DESIGN_OPTION_ID
+_CT_ANNOTATION     = CategoryType.Annotation
+# Display names with a language-independent built-in equivalent
+_PARAM_BIPS = {'Mark': BuiltInParameter.ALL_MODEL_MARK}
+
+# Tag-family picker groups, checked in order against category + family name
+_DISC_MAP = [
+    ('Structural', ['Structural', 'Beam', 'Column', 'Foundation',
+                    'Brace', 'Truss', 'Rebar']),
+    ('Mechanical', ['Mechanical', 'Duct', 'Air Terminal', 'HVAC',
+                    'Flex Duct', 'Duct Fitting', 'Duct Accessory',
+                    'Duct Insulation']),
+    ('Electrical', ['Electrical', 'Lighting', 'Power', 'Switch',
+                    'Panel', 'Conduit', 'Cable Tray', 'Communication',
+                    'Fire Alarm', 'Nurse Call', 'Security', 'Data',
+                    'Telephone']),
+    ('Plumbing',   ['Plumbing', 'Pipe', 'Sprinkler', 'Sanitary',
+                    'Pipe Fitting', 'Pipe Accessory', 'Flex Pipe']),
+    ('Architectural', ['Door', 'Window', 'Room', 'Space', 'Floor',
+                       'Wall', 'Ceiling', 'Stair', 'Roof',
+                       'Furniture', 'Generic', 'Casework',
+                       'Curtain', 'Parking', 'Area', 'Mass']),
+]
+# One alternation per group: a single search replaces a substring test per
+# keyword, and group order still decides ties
+_DISC_RES = tuple(
+    (label, re.compile('|'.join(re.escape(k.lower()) for k in kws)))
+    for label, kws in _DISC_MAP)
+
+
 def _elem_phase_created(el, doc):
     """Return the IntegerValue of the element's Phase Created, or -1."""
     try:
-        from Autodesk.Revit.DB import BuiltInParameter as BIP
-        p = el.get_Parameter(BIP.PHASE_CREATED)
+        p = el.get_Parameter(_BIP_PHASE_CREATED)
         return p.AsElementId().IntegerValue if p else -1
     except Exception:
         return -1
@@ -1000,8 +1940,7 @@ def _elem_phase_created(el, doc):
 def _elem_phase_name(el, doc):
     """Return display name of the element's Phase Created."""
     try:
-        from Autodesk.Revit.DB import BuiltInParameter as BIP
-        p = el.get_Parameter(BIP.PHASE_CREATED)
+        p = el.get_Parameter(_BIP_PHASE_CREATED)
         if p:
             ph = doc.GetElement(p.AsElementId())
             return ph.Name if ph else 'Unknown'
@@ -1013,8 +1952,7 @@ def _elem_phase_name(el, doc):
 def _elem_design_option(el):
     """Return IntegerValue of the element's DesignOption, or -1."""
     try:
-        from Autodesk.Revit.DB import BuiltInParameter as BIP
-        p = el.get_Parameter(BIP.DESIGN_OPTION_ID)
+        p = el.get_Parameter(_BIP_DESIGN_OPTION)
         return p.AsElementId().IntegerValue if p else -1
     except Exception:
         return -1
@@ -1031,16 +1969,51 @@ class STINGTagsPanel(WPFWindow):
         # ── Snapshot ALL module globals while they are still accessible ──
         # WPF callbacks in IronPython persistent-engine mode lose access
         # to module-level names. We capture the entire namespace here and
-        # restore it inside every callback via globals().update().
+        # restore it inside callbacks via _restore_globals(), which only
+        # merges when the namespace no longer carries this snapshot.
         self._g = dict(globals())
+        self._g['_G_SNAPSHOT'] = self._g
         # ExternalEvent for marshalling to the Revit API thread
         self._revit_event = _revit_event
         _revit_cb._panel = self
+        # Dispatcher resolved once; _dispatch_ui, _defer_ui and deferred
+        # init reuse it
+        self._disp = Dispatcher.CurrentDispatcher
+        _UI_DISP[0] = self._disp
+        # Status-bar brushes for _log, built once and frozen
+        self._brush_err, self._brush_ok = Brushes.Red, Brushes.Black
+        self._brush_input = Brushes.Gray
+        try:
+            if MColor:
+                self._brush_err = SolidColorBrush(MColor.FromRgb(220, 30, 30))
+                self._brush_ok  = SolidColorBrush(MColor.FromRgb(50, 50, 90))
+                self._brush_input = SolidColorBrush(
+                    MColor.FromRgb(0xB0, 0xBE, 0xC5))
+                self._brush_err.Freeze()
+                self._brush_ok.Freeze()
+                self._brush_input.Freeze()
+        except Exception:
+            pass
+        # Slider drags and key repeat are coalesced (see SpacingSlider /
+        # _queue_nudge): one pending update and one accumulated nudge
+        self._spacing_debounce = None
+        self._updating_spacing = False   # set while code drives the slider
+        self._nudge_acc = [0, 0]
         # ── Module-level → instance: WPF callbacks lose module globals ──
         self._fresh = _fresh
         self._bb_center = _bb_center
         self._view_tags = _view_tags
+        self._iter_sel = _iter_sel
         self._sel_tags = _sel_tags
+        self._iter_view_tags = _iter_view_tags
+        self._view_elems = _view_elems
+        self._view_mep_elems = _view_mep_elems
+        self._view_centres = _view_centres
+        self._cat_name = _cat_name
+        self._view_cats = _view_cats
+        self._tag_fallback_syms = _tag_fallback_syms
+        self._view_grid = _view_grid
+        self._tagged_host_ids = _tagged_host_ids
         self._sel_elems = _sel_elems
         self._get_host_center = _get_host_center
         self._get_elbow = _get_elbow
@@ -1051,7 +2024,11 @@ class STINGTagsPanel(WPFWindow):
         self._make_straight = _make_leader_straight
         self._add_multi_leader = _add_multi_leader
         self._set_ids = _set_ids
+        self._sel_int_ids = _sel_int_ids
+        self._set_int_ids = _set_int_ids
         self._tag_data = _tag_data
+        self._write_positions = _write_positions
+        self._tag_arrays = _tag_arrays
         self._iso_get = _iso_get
         self._iso_set = _iso_set
         self._dispatch_ui = _dispatch_ui
@@ -1059,6 +2036,8 @@ class STINGTagsPanel(WPFWindow):
         self._elem_phase_name = _elem_phase_name
         self._elem_design_option = _elem_design_option
         self._MEP_BICS = _MEP_BICS
+        self._MEP_BIC_IDS = _MEP_BIC_IDS
+        self._bic = _bic
         self._BIC_MAP = _BIC_MAP
         self._ISO_PARAMS = _ISO_PARAMS
         self._ISO_TAG_FIELD = _ISO_TAG_FIELD
@@ -1070,7 +2049,7 @@ class STINGTagsPanel(WPFWindow):
         self._doc0, self._uidoc0 = doc, uidoc
         self._organizer   = None
         self._pattern     = PatternLearner()
-        self._mem         = [[], [], []]
+        self._mem         = [frozenset()] * 3   # slots of ElementId ints
         self._iso_scope   = 'view'
         self._iso_overwrite = False
         self._undo_stack  = {}          # keyed by view.Id.IntegerValue, list of (label, snapshots)
@@ -1089,11 +2068,13 @@ class STINGTagsPanel(WPFWindow):
         self._param_db   = None         # loaded lazily from param_db.json
         self._param_cond_rows = 1       # 1, 2, or 3 active condition rows
         self._iso_dash_rows  = []       # current dashboard data
-        self._placement_history = self._load_placement_history()
+        self._placement_history = None  # loaded on first use — _history()
         self._dashboard_rows = []       # ISO dashboard rows (WPF binding)
 
         # v9.4 viewport sync — track last view IntegerValue
         self._last_view_id = None
+        self._last_view = None
+        self._last_sel_count = None
 
         # Restore last tab
         try:
@@ -1126,9 +2107,9 @@ class STINGTagsPanel(WPFWindow):
             'preferred_quadrant': 'auto',
         }
 
-        # Load param DB lazily — populate category filter
-        self._load_param_db()
-        self._populate_param_cat_filter()
+        # Load param DB lazily — populate category filter once the
+        # window is up rather than blocking construction on the JSON parse
+        _defer_ui(self._populate_param_cat_filter)
         # Load colour schemes from config
         self._refresh_colour_scheme_combo()
 
@@ -1137,6 +2118,7 @@ class STINGTagsPanel(WPFWindow):
 
         # DispatcherTimer — 500 ms: sel count + view sync.
         # Started AFTER _wire_events so no tick can fire against uninitialised state.
+        self._hook_dirty_events()
         try:
             self._sel_timer = DispatcherTimer()
             self._sel_timer.Interval = System.TimeSpan.FromMilliseconds(500)
@@ -1145,6 +2127,16 @@ class STINGTagsPanel(WPFWindow):
         except Exception:
             self._sel_timer = None
 
+    _HANDLERS = None   # '<Name>_Click' → function, built on first wiring
+
+    @classmethod
+    def _handler_table(cls):
+        """Map every *_Click method name to its function, once per class."""
+        if cls._HANDLERS is None:
+            cls._HANDLERS = dict((n, getattr(cls, n)) for n in dir(cls)
+                                 if n.endswith('_Click'))
+        return cls._HANDLERS
+
     def _wire_events(self):
         """Wire every XAML event handler.
 
@@ -1173,54 +2165,59 @@ class STINGTagsPanel(WPFWindow):
         _evt  = self._revit_event   # capture locally for closure
         _cb   = _revit_cb           # capture locally for closure
 
-        def _make_click(method_name):
-            """Return a delegate-compatible function for one button."""
+        handlers = self._handler_table()
+
+        def _make_click(method_name, fn):
+            """Return a delegate-compatible function for one button.
+            fn is the handler resolved once from the class table."""
             def _handler(sender, args):
                 def _do():
                     try:
-                        globals().update(panel_ref._g)
-                        fn = getattr(panel_ref, method_name, None)
-                        if fn:
-                            fn(sender, args)
-                        else:
-                            panel_ref._log('No handler: ' + method_name, '!')
+                        panel_ref._restore_globals()
+                        _clear_op_caches()
+                        fn(panel_ref, sender, args)
                     except Exception as ex:
                         try:
                             panel_ref._log(method_name + ': ' + str(ex), '!')
                         except Exception:
                             pass
                 if _evt:
-                    _cb._fn = _do
-                    _evt.Raise()
+                    _cb.post(_do, _evt)
                 else:
                     _do()
             return _handler
 
-        # ── Recursive walk through the LOGICAL tree ──────────────────
-        def _walk(element):
-            # Only inspect DependencyObjects (skip strings etc.)
-            if not isinstance(element, DependencyObject):
-                return
-            # Wire this element if it is a Button with a Tag
-            if isinstance(element, _WBtn):
-                try:
-                    raw_tag = element.Tag
-                    if raw_tag is not None:
-                        tag_str = str(raw_tag)
-                        if tag_str.endswith('_Click'):
-                            if hasattr(panel_ref, tag_str):
-                                element.Click += _make_click(tag_str)
+        # ── Iterative walk through the LOGICAL tree ──────────────────
+        def _walk(root):
+            # Breadth-first with an explicit queue — no Python frame per
+            # node.  Only DependencyObjects are queued (skips strings etc.)
+            queue = deque([root])
+            pop, extend = queue.popleft, queue.extend
+            while queue:
+                element = pop()
+                # Wire this element if it is a Button with a Tag
+                if isinstance(element, _WBtn):
+                    try:
+                        raw_tag = element.Tag
+                        if raw_tag is not None:
+                            # XAML string Tags already are Python str
+                            tag_str = (raw_tag if isinstance(raw_tag, str)
+                                       else str(raw_tag))
+                            # Table keys all end in _Click: one dict probe,
+                            # suffix test only to count the misses
+                            fn = handlers.get(tag_str)
+                            if fn is not None:
+                                element.Click += _make_click(tag_str, fn)
                                 wired[0] += 1
-                            else:
+                            elif tag_str.endswith('_Click'):
                                 missed[0] += 1
+                    except Exception:
+                        pass
+                try:
+                    extend(c for c in LogicalTreeHelper.GetChildren(element)
+                           if isinstance(c, DependencyObject))
                 except Exception:
                     pass
-            # Recurse into children
-            try:
-                for child in LogicalTreeHelper.GetChildren(element):
-                    _walk(child)
-            except Exception:
-                pass
 
         # ── Execute the walk ─────────────────────────────────────────
         try:
@@ -1242,9 +2239,7 @@ class STINGTagsPanel(WPFWindow):
                 try: self.RefreshLiveParams_Click(None, None)
                 except Exception: pass
             try:
-                Dispatcher.CurrentDispatcher.BeginInvoke(
-                    DispatcherPriority.Background,
-                    System.Action(_deferred_init))
+                self._disp.BeginInvoke(_UI_BG, System.Action(_deferred_init))
             except Exception: pass
         else:
             self._log('WARNING: 0 buttons wired — tree walk failed', '!')
@@ -1256,7 +2251,8 @@ class STINGTagsPanel(WPFWindow):
             def _wrapped(sender, args):
                 def _do():
                     try:
-                        globals().update(panel_ref._g)
+                        panel_ref._restore_globals()
+                        _clear_op_caches()
                         method(sender, args)
                     except Exception as ex:
                         try:
@@ -1264,8 +2260,7 @@ class STINGTagsPanel(WPFWindow):
                         except Exception:
                             pass
                 if _evt:
-                    _cb._fn = _do
-                    _evt.Raise()
+                    _cb.post(_do, _evt)
                 else:
                     _do()
             return _wrapped
@@ -1277,7 +2272,7 @@ class STINGTagsPanel(WPFWindow):
             """Wrap an instance method, restoring globals but without ExternalEvent."""
             def _wrapped(sender, args):
                 try:
-                    globals().update(panel_ref._g)
+                    panel_ref._restore_globals()
                     method(sender, args)
                 except Exception as ex:
                     try:
@@ -1387,20 +2382,40 @@ class STINGTagsPanel(WPFWindow):
         """Load per-category placement offset history from lib/placement_history.json."""
         try:
             with io.open(self._history_path(), encoding='utf-8') as f:
-                return json.load(f)
+                return _json_fast.load(f)
         except Exception:
             return {}   # {category_name: {'count': int, 'sum_dx': float, 'sum_dy': float}}
 
+    def _history(self):
+        """Placement history dict, read from disk on first access."""
+        if self._placement_history is None:
+            self._placement_history = self._load_placement_history()
+        return self._placement_history
+
     def _save_placement_history(self):
         """Persist placement history to data/placement_history.json."""
+        if self._placement_history is None:
+            return      # never loaded, so nothing changed
         try:
             p = self._history_path()
             try:
                 os.makedirs(os.path.dirname(p))
             except OSError:
                 pass
-            with io.open(p, 'w', encoding='utf-8') as f:
-                json.dump(self._placement_history, f, indent=2)
+            # Serialise first, then swap a temp file in — no torn writes
+            data = json.dumps(self._placement_history, indent=2)
+            if not isinstance(data, type(u'')):
+                data = data.decode('utf-8')
+            tmp = p + '.tmp'
+            with io.open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            _replace = getattr(os, 'replace', None)
+            if _replace:
+                _replace(tmp, p)
+            else:
+                if os.path.exists(p):
+                    os.remove(p)
+                os.rename(tmp, p)
         except Exception:
             pass
 
@@ -1414,16 +2429,18 @@ class STINGTagsPanel(WPFWindow):
             h   = tag.TagHeadPosition
             dx  = h.X - c.X
             dy  = h.Y - c.Y
-            rec = self._placement_history.setdefault(
-                cat, {'count': 0, 'sum_dx': 0.0, 'sum_dy': 0.0})
-            rec['count']  += 1
-            rec['sum_dx'] += dx
-            rec['sum_dy'] += dy
+            # get() first: setdefault would build a throwaway dict per call
+            hist = self._history()
+            rec = hist.get(cat)
+            if rec is None:
+                rec = hist[cat] = {'count': 0, 'sum_dx': 0.0, 'sum_dy': 0.0}
+            n  = rec['count'] + 1
+            sx = rec['sum_dx'] + dx
+            sy = rec['sum_dy'] + dy
             # Keep running totals capped at 200 observations per category
-            if rec['count'] > 200:
-                rec['count']  = 100
-                rec['sum_dx'] = (rec['sum_dx'] / 2.0)
-                rec['sum_dy'] = (rec['sum_dy'] / 2.0)
+            if n > 200:
+                n, sx, sy = 100, sx / 2.0, sy / 2.0
+            rec['count'], rec['sum_dx'], rec['sum_dy'] = n, sx, sy
         except Exception:
             pass
 
@@ -1433,31 +2450,121 @@ class STINGTagsPanel(WPFWindow):
             self._save_placement_history()
         except Exception:
             pass
+        _clear_op_caches()
         try:
             if self._sel_timer:
                 self._sel_timer.Stop()
         except Exception:
             pass
+        self._unhook_dirty_events()
+
+    # ── Timer gating: Revit events mark the panel dirty ───────────────────────
+    def _hook_dirty_events(self):
+        """Subscribe ViewActivated + SelectionChanged (Revit 2023+) so the
+        timer tick can skip idle polls.  Without both, the tick always polls."""
+        self._needs_poll   = True
+        self._dirty_hooked = []
+        # Same objects for += and -=
+        self._dirty_cbs    = {'ViewActivated':   self._on_view_activated,
+                              'SelectionChanged': self._mark_dirty}
+        try:
+            uiapp = __revit__
+            for name in ('ViewActivated', 'SelectionChanged'):
+                evt = getattr(uiapp, name, None)
+                if evt is None:
+                    continue
+                evt += self._dirty_cbs[name]
+                self._dirty_hooked.append(name)
+        except Exception:
+            pass
+        # Model edits (ours, the user's, undo) invalidate the live caches
+        self._live_caches = _LIVE_CACHES
+        self._bb_live    = _BB_CACHE_LIVE
+        self._doc_cb     = self._on_doc_changed
+        self._doc_hooked = False
+        try:
+            __revit__.Application.DocumentChanged += self._doc_cb
+            self._doc_hooked = True
+            _BB_CACHE_LIVE[0] = True
+        except Exception:
+            pass
+
+    def _unhook_dirty_events(self):
+        try:
+            uiapp = __revit__
+            for name in self._dirty_hooked:
+                evt = getattr(uiapp, name)
+                evt -= self._dirty_cbs[name]
+        except Exception:
+            pass
+        self._dirty_hooked = []
+        if self._doc_hooked:
+            try:
+                __revit__.Application.DocumentChanged -= self._doc_cb
+            except Exception:
+                pass
+            self._doc_hooked = False
+        self._bb_live[0] = False
+        self._drop_live_caches()
+
+    def _drop_live_caches(self):
+        for cache in self._live_caches:
+            cache.clear()
+
+    def _mark_dirty(self, sender=None, args=None):
+        self._needs_poll = True
+
+    def _on_view_activated(self, sender=None, args=None):
+        # Cache keys are element/view ids, which repeat across documents
+        try:
+            prev = args.PreviousActiveView
+            if prev is None or not prev.Document.Equals(args.Document):
+                self._drop_live_caches()
+        except Exception:
+            self._drop_live_caches()
+        self._needs_poll = True
+
+    def _on_doc_changed(self, sender=None, args=None):
+        self._drop_live_caches()
+        self._needs_poll = True
 
     # ── Enhancement 2: live selection count timer tick ─────────────────────────
     def _sel_timer_tick(self, s, e):
-        """Polls uidoc selection count every 500 ms; updates badge + viewport sync."""
-        globals().update(self._g)
+        """Polls uidoc selection count every 500 ms; updates badge + viewport sync.
+        Skipped when the dirty events are hooked and nothing has fired."""
+        if len(self._dirty_hooked) == 2:
+            if not self._needs_poll:
+                return
+            self._needs_poll = False
+        self._restore_globals()
         try:
             doc, uidoc = self._fd()
+        except Exception:
+            return
+        try:
             count = uidoc.Selection.GetElementIds().Count if uidoc else 0
-            self.SelCountBadge.Text = str(count)
+            # Only touch the badge when the count moved (skips a WPF layout pass)
+            if count != self._last_sel_count:
+                self._last_sel_count = count
+                self.SelCountBadge.Text = str(count)
         except Exception:
             pass
         # v9.4 Viewport sync — detect view change
         try:
-            doc, uidoc = self._fd()
             if doc and uidoc:
                 cur_view = doc.ActiveView
-                cur_id   = cur_view.Id.IntegerValue if cur_view else None
-                if cur_id and cur_id != self._last_view_id:
-                    self._last_view_id = cur_id
-                    self._on_view_changed(doc, uidoc, cur_view)
+                if cur_view is not None and cur_view is not self._last_view:
+                    self._last_view = cur_view
+                    cur_id = cur_view.Id.IntegerValue
+                    if cur_id != self._last_view_id:
+                        self._last_view_id = cur_id
+                        _clear_op_caches()
+                        # Without the ViewActivated hook a document switch
+                        # goes unseen, and the id-keyed live caches would
+                        # collide across documents
+                        if 'ViewActivated' not in self._dirty_hooked:
+                            self._drop_live_caches()
+                        self._on_view_changed(doc, uidoc, cur_view)
         except Exception:
             pass
 
@@ -1476,11 +2583,21 @@ class STINGTagsPanel(WPFWindow):
     def _check_view_sync(self, s=None, e=None):
         pass   # viewport sync handled inside _sel_timer_tick
 
+    def _restore_globals(self):
+        """Re-seed module globals from the snapshot only if they were lost."""
+        g = globals()
+        if g.get('_G_SNAPSHOT') is not self._g:
+            g.update(self._g)
+
     def _fd(self):
         """Return (doc, uidoc) — always prefers live __revit__ context."""
         doc, uidoc = self._fresh()
         return doc or self._doc0, uidoc or self._uidoc0
 
+    def _centre_columns(self, doc, view):
+        """(elements, xs, ys) for the view's elements that have a centre."""
+        return self._view_centres(doc, view)[:3]
+
     def _spacing(self):
         try:
             v = float(self.SpacingInput.Text)
@@ -1499,18 +2616,11 @@ class STINGTagsPanel(WPFWindow):
             self.LastToolText.Text = first[:55]
             self.LastToolIcon.Text = str(icon)
             # Make errors more visible
-            if icon == '!':
-                try:
-                    self.StatusText.Foreground = SolidColorBrush(
-                        MColor.FromRgb(220, 30, 30)) if MColor else Brushes.Red
-                except Exception:
-                    pass
-            else:
-                try:
-                    self.StatusText.Foreground = SolidColorBrush(
-                        MColor.FromRgb(50, 50, 90)) if MColor else Brushes.Black
-                except Exception:
-                    pass
+            try:
+                self.StatusText.Foreground = (self._brush_err if icon == '!'
+                                              else self._brush_ok)
+            except Exception:
+                pass
         except Exception:
             pass
 
@@ -1629,14 +2739,20 @@ class STINGTagsPanel(WPFWindow):
             return
 
         def _queue_nudge(dx, dy):
-            """Queue a nudge operation to run on the Revit API thread."""
+            """Queue a nudge operation to run on the Revit API thread.
+            Key repeats arriving before it runs add to the same nudge."""
             panel = self
+            acc = self._nudge_acc
+            if not self._revit_event:
+                return
+            acc[0] += dx; acc[1] += dy
             def _do():
-                globals().update(panel._g)
-                panel._nudge(dx, dy)
-            if self._revit_event:
-                _revit_cb._fn = _do
-                self._revit_event.Raise()
+                panel._restore_globals()
+                ax, ay = acc
+                acc[0] = acc[1] = 0
+                if ax or ay:
+                    panel._nudge(ax, ay)
+            _revit_cb.post(_do, self._revit_event, 'nudge')
 
         if e.Key == Key.Up:
             _queue_nudge(0, 1);  e.Handled = True
@@ -1665,11 +2781,10 @@ class STINGTagsPanel(WPFWindow):
                     self.Close()
             else:
                 def _do_clear():
-                    globals().update(self._g)
+                    self._restore_globals()
                     self.SelClear_Click(s, e)
                 if self._revit_event:
-                    _revit_cb._fn = _do_clear
-                    self._revit_event.Raise()
+                    _revit_cb.post(_do_clear, self._revit_event, 'sel_clear')
                 self._esc_was_empty = is_empty
             e.Handled = True
 
@@ -1687,29 +2802,51 @@ class STINGTagsPanel(WPFWindow):
         if valid:
             self.StatusText.Text = 'Spacing: {}ft'.format(v)
             # Enhancement 3: keep slider in sync (clamp to slider range 0.01–2.0)
-            try:
-                self.SpacingSlider.Value = max(0.01, min(2.0, v))
-            except Exception:
-                pass
+            self._set_spacing_slider(v)
         else:
             self.StatusText.Text = 'Invalid spacing (0.01–10.0 ft)'
 
     # ── Enhancement 3: spacing slider ─────────────────────────────────────────
+    def _set_spacing_slider(self, v):
+        """Move the slider to v without echoing it back into the text box."""
+        self._updating_spacing = True
+        try:
+            self.SpacingSlider.Value = max(0.01, min(2.0, v))
+        except Exception:
+            pass
+        finally:
+            self._updating_spacing = False
+
     def SpacingSlider_ValueChanged(self, s, e):
-        """Slider changed → push new value into the text box."""
+        """Slider changed → restart an 80 ms debounce; only the value the
+        drag settles on reaches the text box."""
+        if self._updating_spacing:
+            return
+        try:
+            if self._spacing_debounce is None:
+                tm = DispatcherTimer()
+                tm.Interval = System.TimeSpan.FromMilliseconds(80)
+                tm.Tick += self._spacing_debounce_tick
+                self._spacing_debounce = tm
+            self._spacing_debounce.Stop()
+            self._spacing_debounce.Start()
+        except Exception:
+            self._apply_spacing_slider()
+
+    def _spacing_debounce_tick(self, s, e):
+        self._restore_globals()
+        try:
+            self._spacing_debounce.Stop()
+        except Exception:
+            pass
+        self._apply_spacing_slider()
+
+    def _apply_spacing_slider(self):
+        """Push the slider value into the text box."""
         try:
             v = round(self.SpacingSlider.Value, 3)
-            # Only update text if materially different (avoids feedback loop)
-            try:
-                existing = float(self.SpacingInput.Text)
-                if abs(existing - v) < 0.0005:
-                    return
-            except Exception:
-                pass
             self.SpacingInput.Text = str(v)
-            # (module-level import)
-            self.SpacingInput.BorderBrush = SolidColorBrush(
-                Color.FromRgb(0xB0, 0xBE, 0xC5))
+            self.SpacingInput.BorderBrush = self._brush_input
             self.StatusText.Text = 'Spacing: {}ft'.format(v)
         except Exception:
             pass
@@ -1728,7 +2865,7 @@ class STINGTagsPanel(WPFWindow):
                     Color.FromRgb(0xB0, 0xBE, 0xC5))
                 # Enhancement 3: sync slider
                 try:
-                    self.SpacingSlider.Value = max(0.01, min(2.0, float(tag)))
+                    self._set_spacing_slider(float(tag))
                 except Exception:
                     pass
                 self._log('Spacing preset: {}ft  ({})'.format(
@@ -1742,6 +2879,7 @@ class STINGTagsPanel(WPFWindow):
     # ─────────────────────────────────────────────────────────────────────────
 
     # ── AI Smart ──────────────────────────────────────────────────────────────
+    @_pause_sel_timer
     def SmartPredict_Click(self, s, e):
         """3-layer heuristic selector biased by persistent placement history.
 
@@ -1755,30 +2893,21 @@ class STINGTagsPanel(WPFWindow):
         view = doc.ActiveView
 
         # Collect already-tagged element IDs
-        tagged_ids = set()
-        for t in self._view_tags(doc, view):
-            try:
-                for el in t.GetTaggedLocalElements():
-                    tagged_ids.add(el.Id.IntegerValue)
-            except Exception:
-                pass
+        tagged_ids = self._tagged_host_ids(doc, view)
 
         # Layer 1: untagged MEP elements
-        untagged = []
-        for bic in self._MEP_BICS:
-            try:
-                for el in FilteredElementCollector(doc, view.Id).OfCategory(bic) \
-                        .WhereElementIsNotElementType().ToElements():
-                    if el.Id.IntegerValue not in tagged_ids:
-                        untagged.append(el)
-            except Exception:
-                pass
+        try:
+            untagged = [el for el in self._view_mep_elems(doc, view)
+                        if el.Id.IntegerValue not in tagged_ids]
+        except Exception:
+            untagged = []
         if untagged:
             # Sort by history frequency — most-tagged categories first
-            hist = self._placement_history
+            hist = self._history()
+            cat_name = self._cat_name
             def _priority(el):
                 try:
-                    rec = hist.get(el.Category.Name, {})
+                    rec = hist.get(cat_name(el), {})
                     return -(rec.get('count', 0))
                 except Exception:
                     return 0
@@ -1791,44 +2920,46 @@ class STINGTagsPanel(WPFWindow):
             self._log('PREDICT → {} untagged elements{}'.format(n, hint), '🔮'); return
 
         # Layer 2: extend selection to full dominant category
-        cur = [doc.GetElement(i) for i in uidoc.Selection.GetElementIds()
-               if doc.GetElement(i)]
+        cur = [el for el in self._iter_sel(doc, uidoc) if el]
         if cur:
-            cats = {}
+            cats, names = Counter(), {}
             for el in cur:
-                try: cats[el.Category.Name] = cats.get(el.Category.Name, 0) + 1
-                except Exception: pass
+                cat = el.Category
+                if cat:
+                    cid = cat.Id
+                    cats[cid.IntegerValue] += 1
+                    names[cid.IntegerValue] = (cid, cat.Name)
             if cats:
-                dominant = max(cats, key=cats.get)
-                matched  = [el for el in
-                            FilteredElementCollector(doc, view.Id)
-                            .WhereElementIsNotElementType().ToElements()
-                            if el.Category and el.Category.Name == dominant]
+                # Revit filters the view by category id natively
+                cid, dominant = names[cats.most_common(1)[0][0]]
+                matched = FilteredElementCollector(doc, view.Id) \
+                    .OfCategoryId(cid).WhereElementIsNotElementType().ToElements()
                 n = self._set_ids(uidoc, matched)
                 self._log('PREDICT → {} "{}" elements'.format(n, dominant), '🔮'); return
 
         # Layer 3: history-ranked — surface the most frequently tagged category
-        if self._placement_history:
-            ranked = sorted(self._placement_history.items(),
+        hist = self._history()
+        if hist:
+            ranked = sorted(hist.items(),
                             key=lambda x: x[1].get('count', 0), reverse=True)
+            # One pass groups the view by category name for every rank
+            by_cat = defaultdict(list)
+            cat_name = self._cat_name
+            for el in self._view_elems(doc, view):
+                name = cat_name(el)
+                if name: by_cat[name].append(el)
             for cat_name, _ in ranked:
-                candidates = [el for el in
-                              FilteredElementCollector(doc, view.Id)
-                              .WhereElementIsNotElementType().ToElements()
-                              if el.Category and el.Category.Name == cat_name]
+                candidates = by_cat.get(cat_name)
                 if candidates:
                     n = self._set_ids(uidoc, candidates)
                     self._log('PREDICT → {} "{}" elements (from history)'.format(
                         n, cat_name), '🔮'); return
 
         # Layer 4: all MEP elements
-        all_mep = []
-        for bic in self._MEP_BICS:
-            try:
-                all_mep.extend(FilteredElementCollector(doc, view.Id)
-                               .OfCategory(bic).WhereElementIsNotElementType().ToElements())
-            except Exception:
-                pass
+        try:
+            all_mep = self._view_mep_elems(doc, view)
+        except Exception:
+            all_mep = ()
         n = self._set_ids(uidoc, all_mep)
         self._log('PREDICT → {} MEP elements (full view)'.format(n), '🔮')
 
@@ -1836,7 +2967,7 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         try:
-            cur = [doc.GetElement(i) for i in uidoc.Selection.GetElementIds() if doc.GetElement(i)]
+            cur = [el for el in self._iter_sel(doc, uidoc) if el]
             if not cur: self._log('Select elements first'); return
             type_ids = set(el.GetTypeId().IntegerValue for el in cur
                            if el.GetTypeId() and el.GetTypeId() != ElementId.InvalidElementId)
@@ -1848,45 +2979,50 @@ class STINGTagsPanel(WPFWindow):
 
         except Exception as ex:
             self._log(str(ex))
+    @_pause_sel_timer
     def SelectChain_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
         try:
-            cur = [doc.GetElement(i) for i in uidoc.Selection.GetElementIds() if doc.GetElement(i)]
+            cur = [el for el in self._iter_sel(doc, uidoc) if el]
             if not cur: self._log('Select seed elements first'); return
             view = doc.ActiveView
             radius = self._spacing() * 5
-            all_elems = list(FilteredElementCollector(doc, view.Id)
-                             .WhereElementIsNotElementType().ToElements())
+            # Shared view index bucketed at the chain radius, so each
+            # BFS step scans the 3×3 cells around it, not every element
+            els, px, py, _ = self._view_centres(doc, view)
+            grid = self._view_grid(doc, view, radius)
+            ids = [el.Id.IntegerValue for el in els]
+            r2 = radius * radius
             visited = set(el.Id.IntegerValue for el in cur)
-            queue, result = list(cur), list(cur)
-            while queue:
-                el = queue.pop()
+            result = list(cur)
+            queue = []
+            for el in cur:
                 c = self._bb_center(el, view)
-                if not c: continue
-                for other in all_elems:
-                    if other.Id.IntegerValue in visited: continue
-                    oc = self._bb_center(other, view)
-                    if oc and math.sqrt((oc.X-c.X)**2+(oc.Y-c.Y)**2) < radius:
-                        visited.add(other.Id.IntegerValue)
-                        queue.append(other); result.append(other)
+                if c: queue.append((c.X, c.Y))
+            while queue:
+                x, y = queue.pop()
+                cx, cy = int(x // radius), int(y // radius)
+                for ox, oy in _ALL_NEIGHBOURS:
+                    for j in grid.get((cx + ox, cy + oy), ()):
+                        if ids[j] in visited: continue
+                        dx = px[j] - x; dy = py[j] - y
+                        if dx * dx + dy * dy < r2:
+                            visited.add(ids[j])
+                            result.append(els[j])
+                            queue.append((px[j], py[j]))
             n = self._set_ids(uidoc, result)
             self._log('Chain: {} connected elements'.format(n), '*')
 
         except Exception as ex:
             self._log(str(ex))
+    @_pause_sel_timer
     def SelectCluster_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
         view = doc.ActiveView
-        all_elems = list(FilteredElementCollector(doc, view.Id)
-                         .WhereElementIsNotElementType().ToElements())
-        positions, idx_map = [], {}
-        for el in all_elems:
-            c = self._bb_center(el, view)
-            if c:
-                idx_map[len(positions)] = el
-                positions.append(Vec2(c.X, c.Y))
+        els, px, py, _ = self._view_centres(doc, view)
+        positions = [Vec2(x, y) for x, y in zip(px, py)]
         if len(positions) < 3: self._log('Need 3+ elements'); return
         try:
             clusters = DBSCAN(positions, eps=self._spacing()*4, min_pts=2).run()
@@ -1894,31 +3030,33 @@ class STINGTagsPanel(WPFWindow):
             self._log('DBSCAN error: ' + str(ex)); return
         valid = {k: v for k, v in clusters.items() if k != -1}
         if not valid: self._log('No clusters found'); return
-        cur = [doc.GetElement(i) for i in uidoc.Selection.GetElementIds() if doc.GetElement(i)]
+        cur = [el for el in self._iter_sel(doc, uidoc) if el]
         if cur:
-            cpts = [self._bb_center(el, view) for el in cur if self._bb_center(el, view)]
+            cpts = [c for c in (self._bb_center(el, view) for el in cur) if c]
             if cpts:
                 scx = sum(c.X for c in cpts)/len(cpts)
                 scy = sum(c.Y for c in cpts)/len(cpts)
+                hyp = math.hypot
                 best_k = min(valid, key=lambda k: sum(
-                    math.sqrt((positions[i].x-scx)**2+(positions[i].y-scy)**2)
+                    hyp(px[i]-scx, py[i]-scy)
                     for i in valid[k]) / max(len(valid[k]), 1))
-                result = [idx_map[i] for i in valid[best_k] if i in idx_map]
+                result = [els[i] for i in valid[best_k]]
                 n = self._set_ids(uidoc, result)
                 self._log('Nearest cluster: {} elements'.format(n), '*'); return
         biggest = max(valid, key=lambda k: len(valid[k]))
-        result = [idx_map[i] for i in valid[biggest] if i in idx_map]
+        result = [els[i] for i in valid[biggest]]
         n = self._set_ids(uidoc, result)
         self._log('Largest cluster: {} elements'.format(n), '*')
 
+    @_pause_sel_timer
     def SelectPattern_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
         try:
-            cur = [doc.GetElement(i) for i in uidoc.Selection.GetElementIds() if doc.GetElement(i)]
+            cur = [el for el in self._iter_sel(doc, uidoc) if el]
             if len(cur) < 3: self._log('Select 3+ elements to detect grid'); return
             view = doc.ActiveView
-            pts = [self._bb_center(el, view) for el in cur if self._bb_center(el, view)]
+            pts = [c for c in (self._bb_center(el, view) for el in cur) if c]
             xs = sorted(set(round(p.X, 2) for p in pts))
             ys = sorted(set(round(p.Y, 2) for p in pts))
             dx = min((xs[i+1]-xs[i] for i in range(len(xs)-1)), default=None)
@@ -1926,16 +3064,17 @@ class STINGTagsPanel(WPFWindow):
             if not dx and not dy: self._log('Could not detect grid spacing'); return
             step = min(dx or dy, dy or dx)
             tol = step * 0.35
-            base_x = pts[0].X; base_y = pts[0].Y
-            all_elems = list(FilteredElementCollector(doc, view.Id)
-                             .WhereElementIsNotElementType().ToElements())
-            matched = []
-            for el in all_elems:
-                c = self._bb_center(el, view)
-                if not c: continue
-                on_x = dx and (abs((c.X - base_x) % dx) < tol or abs(dx-(c.X-base_x)%dx) < tol)
-                on_y = dy and (abs((c.Y - base_y) % dy) < tol or abs(dy-(c.Y-base_y)%dy) < tol)
-                if on_x or on_y: matched.append(el)
+            els, px, py, _ = self._view_centres(doc, view)
+
+            def on_lines(vals, base, d):
+                # m = (v - base) % d lies in [0, d): within tol of a grid
+                # line unless tol <= m <= d - tol; one % per element
+                if not d: return [False] * len(vals)
+                hi = d - tol
+                return [not (tol <= (v - base) % d <= hi) for v in vals]
+            on_x = on_lines(px, pts[0].X, dx)
+            on_y = on_lines(py, pts[0].Y, dy)
+            matched = [el for el, a, b in zip(els, on_x, on_y) if a or b]
             n = self._set_ids(uidoc, matched)
             self._log('Grid (Δx={:.3f} Δy={:.3f}): {} elements'.format(dx or 0, dy or 0, n), '[Align]')
 
@@ -1949,68 +3088,65 @@ class STINGTagsPanel(WPFWindow):
             picked = forms.SelectFromList.show(edges, title='Select Edge Region')
             if not picked: return
             view = doc.ActiveView
-            all_pts = [(el, self._bb_center(el, view)) for el in
-                       FilteredElementCollector(doc, view.Id)
-                       .WhereElementIsNotElementType().ToElements()]
-            all_pts = [(el, c) for el, c in all_pts if c]
-            if not all_pts: return
-            xs = [c.X for _, c in all_pts]; ys = [c.Y for _, c in all_pts]
+            els, xs, ys = self._centre_columns(doc, view)
+            if not els: return
             min_x, max_x = min(xs), max(xs); min_y, max_y = min(ys), max(ys)
             mx = (max_x-min_x)*0.15; my = (max_y-min_y)*0.15
-            def _in(c):
-                if picked == 'all':    return c.X<min_x+mx or c.X>max_x-mx or c.Y<min_y+my or c.Y>max_y-my
-                if picked == 'left':   return c.X < min_x+mx
-                if picked == 'right':  return c.X > max_x-mx
-                if picked == 'bottom': return c.Y < min_y+my
-                if picked == 'top':    return c.Y > max_y-my
-            matched = [el for el, c in all_pts if _in(c)]
+            lo_x, hi_x, lo_y, hi_y = min_x+mx, max_x-mx, min_y+my, max_y-my
+            # Edge resolved once; each element is one comparison chain
+            if picked == 'all':
+                keep = [x < lo_x or x > hi_x or y < lo_y or y > hi_y
+                        for x, y in zip(xs, ys)]
+            elif picked == 'left':   keep = [x < lo_x for x in xs]
+            elif picked == 'right':  keep = [x > hi_x for x in xs]
+            elif picked == 'bottom': keep = [y < lo_y for y in ys]
+            else:                    keep = [y > hi_y for y in ys]
+            matched = [el for el, k in zip(els, keep) if k]
             n = self._set_ids(uidoc, matched)
             self._log('Boundary ({}): {} elements'.format(picked, n), '[Place]')
 
         except Exception as ex:
             self._log(str(ex))
+    @_pause_sel_timer
     def SelectOutliers_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
         view = doc.ActiveView
-        all_elems = list(FilteredElementCollector(doc, view.Id)
-                         .WhereElementIsNotElementType().ToElements())
-        positions, idx_map = [], {}
-        for el in all_elems:
-            c = self._bb_center(el, view)
-            if c:
-                idx_map[len(positions)] = el
-                positions.append(Vec2(c.X, c.Y))
-        if len(positions) < 5: self._log('Need 5+ elements'); return
-        try:
-            clusters = DBSCAN(positions, eps=self._spacing()*4, min_pts=3).run()
-            outliers = [idx_map[i] for i in clusters.get(-1, []) if i in idx_map]
+        els, px, py, _ = self._view_centres(doc, view)
+        if len(els) < 5: self._log('Need 5+ elements'); return
+        try:
+            # DBSCAN noise straight from the shared grid: a point is an
+            # outlier when it is not a core point (3+ points within eps,
+            # itself included) and no core point lies within eps of it.
+            eps = self._spacing() * 4; e2 = eps * eps
+            nbrs = [[] for _ in els]
+            for i, j in _grid_pairs(self._view_grid(doc, view, eps)):
+                dx = px[i] - px[j]; dy = py[i] - py[j]
+                if dx * dx + dy * dy <= e2:
+                    nbrs[i].append(j); nbrs[j].append(i)
+            core = [len(nb) + 1 >= 3 for nb in nbrs]
+            outliers = [els[i] for i, nb in enumerate(nbrs)
+                        if not core[i] and not any(core[j] for j in nb)]
         except Exception as ex:
-            self._log('DBSCAN error: ' + str(ex)); return
+            self._log('Outlier scan error: ' + str(ex)); return
         n = self._set_ids(uidoc, outliers)
         self._log('Outliers: {} isolated elements'.format(n), '[Find]')
 
+    @_pause_sel_timer
     def SelectDense_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
         try:
             view = doc.ActiveView
-            all_elems = list(FilteredElementCollector(doc, view.Id)
-                             .WhereElementIsNotElementType().ToElements())
-            positions, idx_map = [], {}
-            for el in all_elems:
-                c = self._bb_center(el, view)
-                if c:
-                    idx_map[len(positions)] = el
-                    positions.append(Vec2(c.X, c.Y))
-            if len(positions) < 5: self._log('Need 5+ elements'); return
+            els, px, py = self._centre_columns(doc, view)
+            if len(els) < 5: self._log('Need 5+ elements'); return
             r = self._spacing() * 4
-            density = [(i, sum(1 for j, q in enumerate(positions)
-                               if i != j and positions[i].dist(q) < r))
-                       for i in range(len(positions))]
-            density.sort(key=lambda x: -x[1])
-            top = max(1, len(density)//4)
-            result = [idx_map[i] for i, _ in density[:top] if i in idx_map]
+            # Neighbour counts from a radius-r grid: adjacent cells only
+            counts = _grid_neighbour_counts(
+                px, py, r, self._view_grid(doc, view, r))
+            order = sorted(range(len(els)), key=lambda i: -counts[i])
+            top = max(1, len(order)//4)
+            result = [els[i] for i in order[:top]]
             n = self._set_ids(uidoc, result)
             self._log('Dense (top 25%): {} elements'.format(n), '*')
 
@@ -2047,15 +3183,10 @@ class STINGTagsPanel(WPFWindow):
     def SelAllCats_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
-        cats = {}
-        for el in FilteredElementCollector(doc, doc.ActiveView.Id)\
-                .WhereElementIsNotElementType().ToElements():
-            try:
-                cat = el.Category
-                if cat and cat.Name and not cat.Name.startswith('<'):
-                    cats.setdefault(cat.Name, []).append(el)
-            except Exception:
-                pass
+        try:
+            cats = self._view_cats(doc, doc.ActiveView)
+        except Exception:
+            cats = {}
         if not cats: self._log('No categories found'); return
         picked = forms.SelectFromList.show(sorted(cats), title='Select Category',
                                            multiselect=False, width=380, height=480)
@@ -2065,6 +3196,7 @@ class STINGTagsPanel(WPFWindow):
 
     def SelViewCats_Click(self, s, e): self.SelAllCats_Click(s, e)
 
+    @_pause_sel_timer
     def SelGrid_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
@@ -2080,12 +3212,16 @@ class STINGTagsPanel(WPFWindow):
             except Exception:
                 pass
         view = doc.ActiveView; tol = 0.5
+        gxs, gys = sorted(grid_xs), sorted(grid_ys)
+        def _near(v, arr):
+            # Only the two grid lines bracketing v can be within tol
+            i = bisect_left(arr, v)
+            return ((i < len(arr) and arr[i] - v < tol) or
+                    (i > 0 and v - arr[i - 1] < tol))
         matched = []
-        for el in FilteredElementCollector(doc, view.Id)\
-                .WhereElementIsNotElementType().ToElements():
+        for el in self._view_elems(doc, view):
             c = self._bb_center(el, view)
-            if c and (any(abs(c.X-gx) < tol for gx in grid_xs)
-                      or any(abs(c.Y-gy) < tol for gy in grid_ys)):
+            if c and (_near(c.X, gxs) or _near(c.Y, gys)):
                 matched.append(el)
         n = self._set_ids(uidoc, matched)
         self._log('On grid lines: {} elements'.format(n))
@@ -2095,18 +3231,12 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         view = doc.ActiveView
-        tagged_ids = set()
-        for t in self._view_tags(doc, view):
-            try:
-                for el in t.GetTaggedLocalElements(): tagged_ids.add(el.Id.IntegerValue)
-            except Exception: pass
-        untagged = []
-        for bic in self._MEP_BICS:
-            try:
-                for el in FilteredElementCollector(doc, view.Id).OfCategory(bic)\
-                        .WhereElementIsNotElementType().ToElements():
-                    if el.Id.IntegerValue not in tagged_ids: untagged.append(el)
-            except Exception: pass
+        tagged_ids = self._tagged_host_ids(doc, view)
+        try:
+            untagged = [el for el in self._view_mep_elems(doc, view)
+                        if el.Id.IntegerValue not in tagged_ids]
+        except Exception:
+            untagged = []
         n = self._set_ids(uidoc, untagged)
         self._log('Untagged: {} elements'.format(n), '*')
 
@@ -2114,13 +3244,8 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         view = doc.ActiveView
-        host_ids = set()
-        for t in self._view_tags(doc, view):
-            try:
-                for el in t.GetTaggedLocalElements(): host_ids.add(el.Id.IntegerValue)
-            except Exception: pass
-        tagged = [doc.GetElement(ElementId(i)) for i in host_ids
-                  if doc.GetElement(ElementId(i))]
+        tagged = [el for el in (doc.GetElement(ElementId(i)) for i in
+                                self._tagged_host_ids(doc, view)) if el]
         n = self._set_ids(uidoc, tagged)
         self._log('Tagged: {} elements'.format(n))
 
@@ -2129,12 +3254,13 @@ class STINGTagsPanel(WPFWindow):
         if not doc: return
         view = doc.ActiveView
         empty = []
-        for el in FilteredElementCollector(doc, view.Id)\
-                .WhereElementIsNotElementType().ToElements():
-            try:
-                p = el.LookupParameter('Mark')
-                if p and not p.AsString(): empty.append(el)
-            except Exception: pass
+        mark = _PARAM_BIPS['Mark']
+        try:
+            for el in self._view_elems(doc, view):
+                p = el.get_Parameter(mark) or _param_by_name(el, 'Mark')
+                if p is not None and not p.AsString(): empty.append(el)
+        except Exception as ex:
+            self._log(str(ex)); return
         n = self._set_ids(uidoc, empty)
         self._log('Empty Mark: {} elements'.format(n))
 
@@ -2143,9 +3269,16 @@ class STINGTagsPanel(WPFWindow):
         if not doc: return
         try:
             view = doc.ActiveView
-            visible = [el for el in FilteredElementCollector(doc, view.Id)
-                       .WhereElementIsNotElementType().ToElements()
-                       if self._bb_center(el, view)]
+            outline = _crop_outline(view)
+            if outline is not None:
+                # Revit drops everything outside the crop before Python
+                # sees it; passing the filter already implies a box
+                visible = list(FilteredElementCollector(doc, view.Id)
+                               .WherePasses(BoundingBoxIntersectsFilter(outline))
+                               .WhereElementIsNotElementType().ToElements())
+            else:
+                visible = [el for el in self._view_elems(doc, view)
+                           if self._bb_center(el, view)]
             n = self._set_ids(uidoc, visible)
             self._log('Visible (approx): {} elements'.format(n))
 
@@ -2156,16 +3289,24 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         try:
-            cur = [doc.GetElement(i) for i in uidoc.Selection.GetElementIds() if doc.GetElement(i)]
+            cur = [el for el in self._iter_sel(doc, uidoc) if el]
             if not cur: self._log('Select seed elements first'); return
             view = doc.ActiveView; radius = self._spacing() * 5
-            seed_pts = [self._bb_center(el, view) for el in cur if self._bb_center(el, view)]
-            matched = []
-            for el in FilteredElementCollector(doc, view.Id)\
-                    .WhereElementIsNotElementType().ToElements():
-                c = self._bb_center(el, view)
-                if c and any(math.sqrt((c.X-sp.X)**2+(c.Y-sp.Y)**2) < radius for sp in seed_pts):
-                    matched.append(el)
+            seed_pts = [c for c in (self._bb_center(el, view) for el in cur) if c]
+            # Each seed queries the 3×3 cells around it in the shared
+            # view index; the union of hits is the selection
+            els, px, py, _ = self._view_centres(doc, view)
+            grid = self._view_grid(doc, view, radius)
+            r2 = radius * radius
+            hits = set()
+            for p in seed_pts:
+                cx, cy = int(p.X // radius), int(p.Y // radius)
+                for ox, oy in _ALL_NEIGHBOURS:
+                    for j in grid.get((cx + ox, cy + oy), ()):
+                        dx = px[j] - p.X; dy = py[j] - p.Y
+                        if dx * dx + dy * dy < r2:
+                            hits.add(j)
+            matched = [els[j] for j in sorted(hits)]
             n = self._set_ids(uidoc, matched)
             self._log('Near ({:.2f}ft): {} elements'.format(radius, n))
 
@@ -2174,24 +3315,25 @@ class STINGTagsPanel(WPFWindow):
     def SelInRoom_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
-        cur = [doc.GetElement(i) for i in uidoc.Selection.GetElementIds() if doc.GetElement(i)]
+        cur = [el for el in self._iter_sel(doc, uidoc) if el]
         if not cur: self._log('Select element(s) first'); return
         room_names = set()
+        pnames = ('Room: Name', 'Space: Name', 'Room Name')
         for el in cur:
-            for pname in ['Room: Name', 'Space: Name', 'Room Name']:
+            for pname in pnames:
                 try:
-                    p = el.LookupParameter(pname)
-                    if p and p.AsString(): room_names.add(p.AsString()); break
+                    p = _param_by_name(el, pname)
+                    v = p.AsString() if p else None
+                    if v: room_names.add(v); break
                 except Exception: pass
         if not room_names:
             self._log('No room information on selected elements\n'
                       '(Tip: elements need Room: Name parameter)'); return
         view = doc.ActiveView; matched = []
-        for el in FilteredElementCollector(doc, view.Id)\
-                .WhereElementIsNotElementType().ToElements():
-            for pname in ['Room: Name', 'Space: Name', 'Room Name']:
+        for el in self._view_elems(doc, view):
+            for pname in pnames:
                 try:
-                    p = el.LookupParameter(pname)
+                    p = _param_by_name(el, pname)
                     if p and p.AsString() in room_names: matched.append(el); break
                 except Exception: pass
         n = self._set_ids(uidoc, matched)
@@ -2201,21 +3343,21 @@ class STINGTagsPanel(WPFWindow):
     def SelLevel_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
-        cur = [doc.GetElement(i) for i in uidoc.Selection.GetElementIds() if doc.GetElement(i)]
+        cur = [el for el in self._iter_sel(doc, uidoc) if el]
         if not cur: self._log('Select elements first'); return
         level_ids = set()
         for el in cur:
-            try:
-                lid = el.LevelId
-                if lid and lid != ElementId.InvalidElementId: level_ids.add(lid.IntegerValue)
-            except Exception: pass
+            lid = el.LevelId
+            if lid is not None: level_ids.add(lid.IntegerValue)
+        level_ids.discard(-1)   # InvalidElementId
         if not level_ids: self._log('No level info on selected elements'); return
         view = doc.ActiveView; matched = []
-        for el in FilteredElementCollector(doc, view.Id)\
-                .WhereElementIsNotElementType().ToElements():
-            try:
-                if el.LevelId and el.LevelId.IntegerValue in level_ids: matched.append(el)
-            except Exception: pass
+        try:
+            for el in self._view_elems(doc, view):
+                lid = el.LevelId
+                if lid is not None and lid.IntegerValue in level_ids: matched.append(el)
+        except Exception as ex:
+            self._log(str(ex)); return
         n = self._set_ids(uidoc, matched)
         self._log('Same level: {} elements'.format(n))
 
@@ -2226,19 +3368,15 @@ class STINGTagsPanel(WPFWindow):
             q = forms.SelectFromList.show(['NW','NE','SW','SE'], title='View Quadrant')
             if not q: return
             view = doc.ActiveView
-            all_pts = [(el, self._bb_center(el, view)) for el in
-                       FilteredElementCollector(doc, view.Id)
-                       .WhereElementIsNotElementType().ToElements()]
-            all_pts = [(el, c) for el, c in all_pts if c]
-            if not all_pts: return
-            cx = sum(c.X for _, c in all_pts)/len(all_pts)
-            cy = sum(c.Y for _, c in all_pts)/len(all_pts)
-            def _in(c):
-                if q == 'NW': return c.X <= cx and c.Y >= cy
-                if q == 'NE': return c.X >= cx and c.Y >= cy
-                if q == 'SW': return c.X <= cx and c.Y <= cy
-                if q == 'SE': return c.X >= cx and c.Y <= cy
-            matched = [el for el, c in all_pts if _in(c)]
+            els, xs, ys = self._centre_columns(doc, view)
+            if not els: return
+            cx = sum(xs)/len(xs)
+            cy = sum(ys)/len(ys)
+            # Quadrant resolved once: fold the sign so one test serves all
+            sx = 1.0 if q in ('NE', 'SE') else -1.0
+            sy = 1.0 if q in ('NW', 'NE') else -1.0
+            matched = [el for el, x, y in zip(els, xs, ys)
+                       if sx * (x - cx) >= 0 and sy * (y - cy) >= 0]
             n = self._set_ids(uidoc, matched)
             self._log('Quadrant {}: {} elements'.format(q, n))
 
@@ -2258,13 +3396,18 @@ class STINGTagsPanel(WPFWindow):
         val = forms.ask_for_string(prompt='Contains (case-insensitive):', title=pname)
         if val is None: return
         view = doc.ActiveView; matched = []
-        for el in FilteredElementCollector(doc, view.Id)\
-                .WhereElementIsNotElementType().ToElements():
-            try:
-                p = el.LookupParameter(pname)
-                v = p.AsString() if p else ''
-                if v and val.lower() in v.lower(): matched.append(el)
-            except Exception: pass
+        needle = val.lower()
+        # Built-in id where one exists, else the cached-Definition lookup
+        bip = _PARAM_BIPS.get(pname)
+        try:
+            for el in self._view_elems(doc, view):
+                p = el.get_Parameter(bip) if bip is not None else None
+                if p is None:
+                    p = _param_by_name(el, pname)
+                v = p.AsString() if p is not None else None
+                if v and needle in v.lower(): matched.append(el)
+        except Exception as ex:
+            self._log(str(ex)); return
         n = self._set_ids(uidoc, matched)
         self._log('{} contains "{}": {} elements'.format(pname, val, n))
 
@@ -2293,26 +3436,51 @@ class STINGTagsPanel(WPFWindow):
             self._log('Filter builder read error: ' + str(ex)); return
 
         view = doc.ActiveView; matched = []
-        # (module-level import)
-        for el in FilteredElementCollector(doc, view.Id)\
-                .WhereElementIsNotElementType().ToElements():
-            try:
-                p = el.LookupParameter(pname)
-                if p is None: continue
-                if p.StorageType == StorageType.String:
-                    v = p.AsString() or ''
-                elif p.StorageType in (StorageType.Double, StorageType.Integer):
-                    v = str(int(p.AsDouble())) if p.StorageType == StorageType.Double \
-                        else str(p.AsInteger())
-                else:
-                    v = ''
-                if   op == 'is empty'   and not v: matched.append(el)
-                elif op == 'has value'  and v:     matched.append(el)
-                elif op == 'equals'     and v.lower() == val.lower(): matched.append(el)
-                elif op == 'contains'   and val.lower() in v.lower(): matched.append(el)
-                elif op == 'starts with' and v.lower().startswith(val.lower()): matched.append(el)
-            except Exception:
-                pass
+        # Operator and storage types resolved once, not per element; values
+        # are lowercased as they are read, so the tests compare directly
+        needle = val.lower()
+        test = {
+            'is empty':    lambda v: not v,
+            'has value':   lambda v: bool(v),
+            'equals':      lambda v: v == needle,
+            'contains':    lambda v: needle in v,
+            'starts with': lambda v: v.startswith(needle),
+        }.get(op)
+        if test is None:
+            self._log('Unknown filter operator: ' + op); return
+        bip = _PARAM_BIPS.get(pname)
+        st_str, st_dbl, st_int = \
+            StorageType.String, StorageType.Double, StorageType.Integer
+
+        def read_any(p):
+            st = p.StorageType
+            if   st == st_str: return (p.AsString() or '').lower()
+            elif st == st_dbl: return str(int(p.AsDouble()))
+            elif st == st_int: return str(p.AsInteger())
+            return ''
+
+        def read_str(p):
+            # Most filters are on text parameters: skip the StorageType
+            # dispatch unless AsString has nothing (empty, or not text)
+            v = p.AsString()
+            return v.lower() if v is not None else read_any(p)
+
+        read = None   # picked from the first parameter found
+        try:
+            for el in self._view_elems(doc, view):
+                p = el.get_Parameter(bip) if bip is not None else None
+                if p is None:
+                    p = _param_by_name(el, pname)
+                    if p is None: continue
+                try:
+                    if read is None:
+                        read = read_str if p.StorageType == st_str else read_any
+                    v = read(p)
+                except Exception:
+                    continue
+                if test(v): matched.append(el)
+        except Exception as ex:
+            self._log('Filter builder error: ' + str(ex)); return
         n = self._set_ids(uidoc, matched)
         self._log('[Filter] {} {} "{}": {} elements'.format(pname, op, val, n), '▶')
 
@@ -2324,14 +3492,17 @@ class STINGTagsPanel(WPFWindow):
     def SelAll_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
-        view = doc.ActiveView; all_mep = []
-        for bic in self._MEP_BICS:
-            try:
-                all_mep.extend(FilteredElementCollector(doc, view.Id)
-                               .OfCategory(bic).WhereElementIsNotElementType().ToElements())
-            except Exception: pass
-        n = self._set_ids(uidoc, all_mep)
-        self._log('All MEP in view: {} elements'.format(n))
+        view = doc.ActiveView
+        # Ids straight from the multicategory collector into the selection;
+        # no element is materialised for a pure select
+        try:
+            ids = FilteredElementCollector(doc, view.Id) \
+                .WherePasses(_mep_filter()) \
+                .WhereElementIsNotElementType().ToElementIds()
+        except Exception:
+            ids = List[ElementId]()
+        uidoc.Selection.SetElementIds(ids)
+        self._log('All MEP in view: {} elements'.format(ids.Count))
 
     def SelClear_Click(self, s, e):
         _, uidoc = self._fd()
@@ -2353,11 +3524,17 @@ class STINGTagsPanel(WPFWindow):
             proceed = True  # fallback if forms.alert fails
         if not proceed: return
         t = Transaction(doc, 'STINGTags Delete Selection'); t.Start()
-        deleted = 0
-        for eid in ids:
-            try:
-                doc.Delete(eid); deleted += 1
-            except Exception: pass
+        try:
+            # One batch delete; the returned set also holds dependents
+            doc.Delete(List[ElementId](ids))
+            deleted = len(ids)
+        except Exception:
+            # Something in the batch cannot go — delete what can one by one
+            deleted = 0
+            for eid in ids:
+                try:
+                    doc.Delete(eid); deleted += 1
+                except Exception: pass
         t.Commit()
         self._log('Deleted: {} / {} elements'.format(deleted, len(ids)))
 
@@ -2365,51 +3542,58 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         try:
-            cur_ids = set(uidoc.Selection.GetElementIds())
-            inverted = [el for el in FilteredElementCollector(doc, doc.ActiveView.Id)
-                        .WhereElementIsNotElementType().ToElements()
-                        if el.Id not in cur_ids]
-            n = self._set_ids(uidoc, inverted)
-            self._log('Inverted: {} elements'.format(n))
+            # Revit drops the current selection natively; only ids cross
+            # into Python, and they go straight back to SetElementIds
+            cur_ids = uidoc.Selection.GetElementIds()
+            col = FilteredElementCollector(doc, doc.ActiveView.Id) \
+                .WhereElementIsNotElementType()
+            if cur_ids.Count:
+                col = col.Excluding(cur_ids)
+            inverted = col.ToElementIds()
+            uidoc.Selection.SetElementIds(inverted)
+            self._log('Inverted: {} elements'.format(inverted.Count))
 
         except Exception as ex:
             self._log(str(ex))
+    # Set ops run on integer ids; ElementIds are made once, when selecting
     def SelAdd_Click(self, s, e):
         _, uidoc = self._fd()
         if not uidoc: return
-        cur = set(uidoc.Selection.GetElementIds())
-        mem_ids = set(ElementId(i) for i in self._mem[0])
-        combined = list(cur | mem_ids)
-        uidoc.Selection.SetElementIds(List[ElementId](combined))
-        self._log('Added M1 to selection: {} total'.format(len(combined)))
+        cur = self._sel_int_ids(uidoc)
+        cur |= self._mem[0]
+        n = self._set_int_ids(uidoc, cur)
+        self._log('Added M1 to selection: {} total'.format(n))
 
     def SelSubtract_Click(self, s, e):
         _, uidoc = self._fd()
         if not uidoc: return
-        cur = set(uidoc.Selection.GetElementIds())
-        mem_ids = set(ElementId(i) for i in self._mem[0])
-        remaining = list(cur - mem_ids)
-        uidoc.Selection.SetElementIds(List[ElementId](remaining))
-        self._log('Subtracted M1: {} remaining'.format(len(remaining)))
+        cur = self._sel_int_ids(uidoc)
+        cur -= self._mem[0]
+        n = self._set_int_ids(uidoc, cur)
+        self._log('Subtracted M1: {} remaining'.format(n))
 
     def SelIntersect_Click(self, s, e):
         _, uidoc = self._fd()
         if not uidoc: return
-        cur = set(uidoc.Selection.GetElementIds())
-        mem_ids = set(ElementId(i) for i in self._mem[0])
-        intersection = list(cur & mem_ids)
-        uidoc.Selection.SetElementIds(List[ElementId](intersection))
-        self._log('Intersection with M1: {} elements'.format(len(intersection)))
+        # set & frozenset iterates whichever side is smaller
+        n = self._set_int_ids(uidoc, self._sel_int_ids(uidoc) & self._mem[0])
+        self._log('Intersection with M1: {} elements'.format(n))
 
     def SelTags_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
-        sel_ids = set(eid.IntegerValue for eid in uidoc.Selection.GetElementIds())
+        sel_ids = self._sel_int_ids(uidoc)
         view = doc.ActiveView; result = []
-        for t in self._view_tags(doc, view):
+        # Host ids tested one at a time against the selection, stopping at
+        # the first hit: no per-tag set and no host elements materialised
+        for t in (self._iter_view_tags(doc, view) if sel_ids else ()):
             try:
-                host_ids = set(el.Id.IntegerValue for el in t.GetTaggedLocalElements())
-                if host_ids & sel_ids: result.append(t)
+                if _TAG_API_REFS:
+                    hit = any(i.IntegerValue in sel_ids
+                              for i in t.GetTaggedLocalElementIds())
+                else:
+                    hit = t.TaggedLocalElementId.IntegerValue in sel_ids
+                if hit: result.append(t)
             except Exception: pass
         n = self._set_ids(uidoc, result)
         self._log('Tags of selection: {} tags'.format(n))
@@ -2429,7 +3613,7 @@ class STINGTagsPanel(WPFWindow):
     def _mem_save(self, slot):
         _, uidoc = self._fd()
         if not uidoc: return
-        self._mem[slot] = [i.IntegerValue for i in uidoc.Selection.GetElementIds()]
+        self._mem[slot] = frozenset(self._sel_int_ids(uidoc))
         self._log('M{} saved: {} elements'.format(slot+1, len(self._mem[slot])))
 
     def _mem_load(self, slot):
@@ -2438,15 +3622,27 @@ class STINGTagsPanel(WPFWindow):
         raw = self._mem[slot]
         if not raw:
             self._log('M{} is empty'.format(slot+1)); return
-        # Validate IDs exist in the current document
-        valid = []
+        # Validate IDs exist in the current document: one id-set collector
+        # answers for the instances; anything it leaves out (element types,
+        # or every id if the collector rejects the set) is checked singly
+        cand = List[ElementId](len(raw))
         for i in raw:
-            try:
-                el = doc.GetElement(ElementId(i))
-                if el is not None:
-                    valid.append(ElementId(i))
-            except Exception:
-                pass
+            cand.Add(ElementId(i))
+        valid = []
+        try:
+            valid = list(FilteredElementCollector(doc, cand)
+                         .WhereElementIsNotElementType().ToElementIds())
+        except Exception:
+            pass
+        if len(valid) < len(raw):
+            found = set(eid.IntegerValue for eid in valid)
+            for eid in cand:
+                if eid.IntegerValue in found: continue
+                try:
+                    if doc.GetElement(eid) is not None:
+                        valid.append(eid)
+                except Exception:
+                    pass
         stale = len(raw) - len(valid)
         if not valid:
             self._log('M{}: all {} IDs stale — not in this document'.format(slot+1, len(raw))); return
@@ -2489,7 +3685,8 @@ class STINGTagsPanel(WPFWindow):
     # ── Enhancement 4: per-view undo stack ───────────────────────────────────
     def _push_undo(self, tags):
         """Snapshot current positions keyed by the active view's IntegerValue.
-        Each view keeps up to 5 independent snapshots.
+        Each view keeps up to 5 independent snapshots.  Returns the snapshot
+        (tag id → (x, y, z)), or None.
         """
         doc, _ = self._fd()
         if not doc:
@@ -2506,13 +3703,14 @@ class STINGTagsPanel(WPFWindow):
             except Exception:
                 pass
         if not snap:
-            return
+            return None
         if view_key not in self._undo_stack:
             self._undo_stack[view_key] = []
         stack = self._undo_stack[view_key]
         stack.append(snap)
         if len(stack) > 5:
             stack.pop(0)
+        return snap
 
     def UndoOrganise_Click(self, s, e):
         doc, uidoc = self._fd()
@@ -2526,14 +3724,32 @@ class STINGTagsPanel(WPFWindow):
         if not stack:
             self._log('Nothing to undo in this view — stack empty'); return
         snap = stack.pop()
+        if 'tags' in snap:   # labelled snapshot from _push_undo_labelled
+            try:
+                snap = dict((int(k), (v['pos'].X, v['pos'].Y, v['pos'].Z))
+                            for k, v in snap['tags'].items())
+            except Exception:
+                snap = {}
+        # Resolve every snapshot tag in one id-set collector pass; per-id
+        # lookups only if the collector rejects the set (deleted tags)
+        ids = List[ElementId](len(snap))
+        for id_int in snap:
+            ids.Add(ElementId(id_int))
+        try:
+            tags_by_id = dict((tg.Id.IntegerValue, tg) for tg in
+                              FilteredElementCollector(doc, ids)
+                              .OfClass(IndependentTag))
+        except Exception:
+            get = doc.GetElement
+            tags_by_id = dict((eid.IntegerValue, get(eid)) for eid in ids)
         t = Transaction(doc, 'STINGTags Undo'); t.Start()
         restored = 0
         for id_int, (x, y, z) in snap.items():
+            tag = tags_by_id.get(id_int)
+            if tag is None: continue
             try:
-                tag = doc.GetElement(ElementId(id_int))
-                if tag:
-                    tag.TagHeadPosition = XYZ(x, y, z)
-                    restored += 1
+                tag.TagHeadPosition = XYZ(x, y, z)
+                restored += 1
             except Exception:
                 pass
         t.Commit()
@@ -2572,11 +3788,11 @@ class STINGTagsPanel(WPFWindow):
     def QuickFix_Click(self, s, e):
         doc, view, data = self._build_data()
         if not data: return
-        self._push_undo([d['tag'] for d in data])
+        prev = self._push_undo([d['tag'] for d in data])
         try:
             t = Transaction(doc, 'STINGTags Quick Fix'); t.Start()
             ForceEngine(data, self._spacing()).run(40)
-            for d in data: d['tag'].TagHeadPosition = XYZ(d['pos'].x, d['pos'].y, d['z'])
+            self._write_positions(data, prev)
             t.Commit()
             self._log('Quick Fix: {} tags separated'.format(len(data)), '*')
         except Exception as ex:
@@ -2587,11 +3803,11 @@ class STINGTagsPanel(WPFWindow):
     def DeepOptimize_Click(self, s, e):
         doc, view, data = self._build_data()
         if not data: return
-        self._push_undo([d['tag'] for d in data])
+        prev = self._push_undo([d['tag'] for d in data])
         try:
             t = Transaction(doc, 'STINGTags Deep Optimise'); t.Start()
             GeneticAlg(data, self._spacing()).run()
-            for d in data: d['tag'].TagHeadPosition = XYZ(d['pos'].x, d['pos'].y, d['z'])
+            self._write_positions(data, prev)
             t.Commit()
             self._log('Deep Optimise: {} tags (genetic)'.format(len(data)), '*')
         except Exception as ex:
@@ -2602,11 +3818,12 @@ class STINGTagsPanel(WPFWindow):
     def AnnealOpt_Click(self, s, e):
         doc, view, data = self._build_data()
         if not data: return
-        self._push_undo([d['tag'] for d in data])
+        prev = self._push_undo([d['tag'] for d in data])
         try:
             t = Transaction(doc, 'STINGTags Anneal'); t.Start()
-            SimAnneal(data, self._spacing()).run(600)
-            for d in data: d['tag'].TagHeadPosition = XYZ(d['pos'].x, d['pos'].y, d['z'])
+            sa = SimAnneal(data, self._spacing())
+            getattr(sa, 'run_parallel', sa.run)(600)
+            self._write_positions(data, prev)
             t.Commit()
             self._log('Annealing: {} tags'.format(len(data)), '*')
         except Exception as ex:
@@ -2641,16 +3858,25 @@ class STINGTagsPanel(WPFWindow):
         except Exception: pass
         tags = self._view_tags(doc, view)
         if len(tags) > 1:
-            pts = [Vec2(t.TagHeadPosition.X, t.TagHeadPosition.Y) for t in tags]
-            dists = sorted(pts[i].dist(pts[j])
-                           for i in range(len(pts))
-                           for j in range(i+1, len(pts)))
-            if dists:
-                median = dists[len(dists)//2]
+            # Median of squared distances (same order, one sqrt at the
+            # end).  Past _AUTOSPACE_SAMPLE tags an even stride of them
+            # stands in for the view, keeping the pair count bounded.
+            sample = tags
+            if len(tags) > _AUTOSPACE_SAMPLE:
+                step = len(tags) / float(_AUTOSPACE_SAMPLE)
+                sample = [tags[int(k * step)] for k in range(_AUTOSPACE_SAMPLE)]
+            heads = [t.TagHeadPosition for t in sample]
+            xs = [h.X for h in heads]; ys = [h.Y for h in heads]
+            d2 = array('d')
+            for i in range(len(xs) - 1):
+                xi = xs[i]; yi = ys[i]
+                d2.extend([(xj - xi) * (xj - xi) + (yj - yi) * (yj - yi)
+                           for xj, yj in zip(xs[i + 1:], ys[i + 1:])])
+            if d2:
+                median = math.sqrt(sorted(d2)[len(d2) // 2])
                 spacing_ft = round(max(0.08, min(2.0, median * 0.35)), 3)
         self.SpacingInput.Text = str(spacing_ft)
-        # (module-level import)
-        self.SpacingInput.BorderBrush = SolidColorBrush(Color.FromRgb(0xB0, 0xBE, 0xC5))
+        self.SpacingInput.BorderBrush = self._brush_input
         self._log('Auto-space: {:.3f}ft  (view 1:{}, {} tags)'.format(
             spacing_ft, view.Scale, len(tags)), '[Brain]')
 
@@ -2663,35 +3889,72 @@ class STINGTagsPanel(WPFWindow):
             syms = list(FilteredElementCollector(doc)
                         .OfClass(FamilySymbol).ToElements())
 
-            _DISC_MAP = [
-                ('Structural', ['Structural', 'Beam', 'Column', 'Foundation',
-                                'Brace', 'Truss', 'Rebar']),
-                ('Mechanical', ['Mechanical', 'Duct', 'Air Terminal', 'HVAC',
-                                'Flex Duct', 'Duct Fitting', 'Duct Accessory',
-                                'Duct Insulation']),
-                ('Electrical', ['Electrical', 'Lighting', 'Power', 'Switch',
-                                'Panel', 'Conduit', 'Cable Tray', 'Communication',
-                                'Fire Alarm', 'Nurse Call', 'Security', 'Data',
-                                'Telephone']),
-                ('Plumbing',   ['Plumbing', 'Pipe', 'Sprinkler', 'Sanitary',
-                                'Pipe Fitting', 'Pipe Accessory', 'Flex Pipe']),
-                ('Architectural', ['Door', 'Window', 'Room', 'Space', 'Floor',
-                                   'Wall', 'Ceiling', 'Stair', 'Roof',
-                                   'Furniture', 'Generic', 'Casework',
-                                   'Curtain', 'Parking', 'Area', 'Mass']),
-            ]
+            disc_memo = {}
 
             def _disc_of(sym):
+                # First discipline whose keyword regex hits; memoised per
+                # (category, family) since the checked text comes from both
                 try:
-                    cname = sym.Category.Name if sym.Category else ''
-                    fname = sym.Family.Name if sym.Family else ''
-                    check = (cname + ' ' + fname).lower()
-                    for label, keywords in _DISC_MAP:
-                        if any(k.lower() in check for k in keywords):
-                            return label
+                    cat, fam = sym.Category, sym.Family
+                    key = (cat.Id.IntegerValue if cat else None,
+                           fam.Id.IntegerValue if fam else None)
+                    label = disc_memo.get(key)
+                    if label is None:
+                        check = ((cat.Name if cat else '') + ' '
+                                 + (fam.Name if fam else '')).lower()
+                        label = next((lb for lb, rx in _DISC_RES
+                                      if rx.search(check)), 'Other')
+                        disc_memo[key] = label
+                    return label
                 except Exception:
-                    pass
-                return 'Other'
+                    return 'Other'
+
+            # Verdicts memoised per category and per family: thousands of
+            # symbols share a few hundred of each, so the name and enum
+            # checks below run once per category/family, not per symbol.
+            _ANNO_WORDS = ('tag', 'keynote', 'symbol', 'annotation',
+                           'label', 'callout', 'mark', 'leader')
+            cat_verdict, fam_verdict = {}, {}
+
+            def _cat_is_annotation(cat):
+                k = cat.Id.IntegerValue
+                v = cat_verdict.get(k)
+                if v is None:
+                    cname = (cat.Name or '').lower()
+                    v = any(kw in cname for kw in _ANNO_WORDS)
+                    if not v:
+                        try:
+                            v = cat.CategoryType == _CT_ANNOTATION
+                        except Exception:
+                            pass
+                    if not v:
+                        # Annotation tag categories sit in these id ranges
+                        # (Multi-Category Tags at -2009030 / -2009031)
+                        v = (-2010000 < k < -2005000
+                             or -2008130 < k < -2008120)
+                    cat_verdict[k] = v
+                return v
+
+            def _fam_is_annotation(fam):
+                k = fam.Id.IntegerValue
+                v = fam_verdict.get(k)
+                if v is None:
+                    v = False
+                    try:
+                        fc = fam.FamilyCategory
+                        if fc:
+                            fcn = (fc.Name or '').lower()
+                            v = ('tag' in fcn or 'annotation' in fcn
+                                 or fc.CategoryType == _CT_ANNOTATION)
+                    except Exception:
+                        pass
+                    if not v:
+                        try:
+                            v = 'tag' in str(fam.FamilyPlacementType).lower()
+                        except Exception:
+                            pass
+                    fam_verdict[k] = v
+                return v
 
             def _is_annotation_family(sym):
                 """Detect any annotation family: tags, tag containers,
@@ -2700,70 +3963,12 @@ class STINGTagsPanel(WPFWindow):
                     cat = sym.Category
                     if not cat:
                         return False
-                    cname = (cat.Name or '').lower()
-
-                    # Quick wins: name contains 'tag', 'keynote', 'symbol',
-                    # 'callout', 'annotation', 'label'
-                    if any(kw in cname for kw in (
-                        'tag', 'keynote', 'symbol', 'annotation',
-                        'label', 'callout', 'mark', 'leader'
-                    )):
+                    if _cat_is_annotation(cat):
                         return True
-
-                    # Check CategoryType for annotation
-                    try:
-                        ct_str = str(cat.CategoryType)
-                        if 'annotation' in ct_str.lower():
-                            return True
-                    except Exception:
-                        pass
-
-                    # Check Family.FamilyCategory
-                    try:
-                        fam = sym.Family
-                        if fam:
-                            fc = fam.FamilyCategory
-                            if fc:
-                                fcn = (fc.Name or '').lower()
-                                if 'tag' in fcn or 'annotation' in fcn:
-                                    return True
-                                # FamilyCategory.CategoryType
-                                try:
-                                    if 'annotation' in str(fc.CategoryType).lower():
-                                        return True
-                                except Exception:
-                                    pass
-                    except Exception:
-                        pass
-
-                    # Check BuiltInCategory Id range for annotation tags
-                    try:
-                        bic = cat.Id.IntegerValue
-                        # Annotation tag categories in Revit are in these ranges
-                        if -2010000 < bic < -2005000:
-                            return True
-                        if -2009030 < bic < -2009015:
-                            return True
-                        if -2008130 < bic < -2008120:
-                            return True
-                        # Multi-Category Tags
-                        if bic == -2009030 or bic == -2009031:
-                            return True
-                    except Exception:
-                        pass
-
-                    # Check if the family is a "Tag" family by its FamilyPlacementType
-                    try:
-                        if hasattr(sym.Family, 'FamilyPlacementType'):
-                            fpt_str = str(sym.Family.FamilyPlacementType)
-                            if 'tag' in fpt_str.lower():
-                                return True
-                    except Exception:
-                        pass
-
+                    fam = sym.Family
+                    return bool(fam) and _fam_is_annotation(fam)
                 except Exception:
-                    pass
-                return False
+                    return False
 
             groups = {}
             for sym in syms:
@@ -2781,13 +3986,13 @@ class STINGTagsPanel(WPFWindow):
             for disc in groups:
                 groups[disc].sort(key=lambda t: t[0])
 
-            self.TagFamilyCombo.Items.Clear()
+            # Items are built detached and handed to the combo in one
+            # ItemsSource assignment: one refresh instead of one per Add
+            combo_items = List[System.Object]()
             auto_item = ComboBoxItem()
             auto_item.Content = '[Auto — Revit default]'
             auto_item.Tag = None
-            self.TagFamilyCombo.Items.Add(auto_item)
-            self.TagFamilyCombo.SelectedIndex = 0
-            self._tag_sym_id = None
+            combo_items.Add(auto_item)
 
             total = 0
             group_order = ['Architectural', 'Mechanical', 'Electrical',
@@ -2797,21 +4002,27 @@ class STINGTagsPanel(WPFWindow):
                 items = groups.get(disc, [])
                 if not items:
                     continue
-                sep = Separator()
-                self.TagFamilyCombo.Items.Add(sep)
+                combo_items.Add(Separator())
                 hdr = ComboBoxItem()
                 hdr.Content = '── {} ({}) ──'.format(disc.upper(), len(items))
                 hdr.IsEnabled = False
                 hdr.FontSize = 7
-                self.TagFamilyCombo.Items.Add(hdr)
+                combo_items.Add(hdr)
                 for label, sym in items:
                     ci = ComboBoxItem()
                     ci.Content = label
                     ci.Tag = sym.Id.IntegerValue
-                    self.TagFamilyCombo.Items.Add(ci)
+                    combo_items.Add(ci)
                     total += 1
                 populated.append('{} {}'.format(disc, len(items)))
 
+            combo = self.TagFamilyCombo
+            if combo.ItemsSource is None:
+                combo.Items.Clear()   # XAML items block ItemsSource
+            combo.ItemsSource = combo_items
+            combo.SelectedIndex = 0
+            self._tag_sym_id = None
+
             info = '  |  '.join(populated) if populated else 'No tag families'
             try:
                 self.TagFamilyGroupInfo.Text = info
@@ -2847,36 +4058,48 @@ class STINGTagsPanel(WPFWindow):
 
     def _place_tag(self, doc, view, el, sp):
         """Place IndependentTag, then swap family if a specific one is selected."""
-        c = self._bb_center(el, view)
-        if not c:
-            return None
-        tag = None
-        tag_pt = XYZ(c.X, c.Y + sp, c.Z)
-        try:
-            # Revit 2022+ API
-            tag = IndependentTag.Create(
-                doc, view.Id, Reference(el), False,
-                TagMode.TM_ADDBY_CATEGORY, TagOrientation.Horizontal,
-                tag_pt)
-        except TypeError:
-            try:
-                # Revit 2023+ with LinkElementId
-                from Autodesk.Revit.DB import LinkElementId
-                tag = IndependentTag.Create(
-                    doc, view.Id, Reference(el), False,
-                    TagMode.TM_ADDBY_CATEGORY, TagOrientation.Horizontal,
-                    LinkElementId(el.Id), tag_pt)
-            except Exception:
-                pass
-        except Exception:
-            pass
+        return self._tag_placer(doc, view, sp)(el)
+
+    def _tag_placer(self, doc, view, sp):
+        """place(el) -> new tag or None, for batch loops.  The view id, the
+        selected tag family and the working IndependentTag.Create overload
+        are resolved once per batch rather than once per element."""
+        view_id = view.Id
         sym_id = self._get_tag_sym_id()
-        if tag and sym_id:
-            try:
-                tag.ChangeTypeId(sym_id)
+        bb_center = self._bb_center
+        create = IndependentTag.Create
+        mode, orient = TagMode.TM_ADDBY_CATEGORY, TagOrientation.Horizontal
+        use_link = [False]
+        def place(el):
+            c = bb_center(el, view)
+            if not c:
+                return None
+            tag = None
+            tag_pt = XYZ(c.X, c.Y + sp, c.Z)
+            try:
+                if not use_link[0]:
+                    # Revit 2022+ API
+                    tag = create(doc, view_id, Reference(el), False,
+                                 mode, orient, tag_pt)
+            except TypeError:
+                use_link[0] = True
             except Exception:
                 pass
-        return tag
+            if use_link[0]:
+                try:
+                    # Revit 2023+ with LinkElementId
+                    from Autodesk.Revit.DB import LinkElementId
+                    tag = create(doc, view_id, Reference(el), False,
+                                 mode, orient, LinkElementId(el.Id), tag_pt)
+                except Exception:
+                    pass
+            if tag and sym_id:
+                try:
+                    tag.ChangeTypeId(sym_id)
+                except Exception:
+                    pass
+            return tag
+        return place
 
     # ── Tag operations ─────────────────────────────────────────────────────────
     def TagSelected_Click(self, s, e):
@@ -2891,26 +4114,21 @@ class STINGTagsPanel(WPFWindow):
             item = self.TagFamilyCombo.SelectedItem
             if item and item.Tag: sym_label = '  [{}]'.format(item.Content)
         except Exception: pass
-        # Build per-category fallback symbol map from loaded tag families
-        _fallback_syms = {}
+        # Per-category fallback symbol map from loaded tag families
         try:
-            # (module-level import)
-            for sym in FilteredElementCollector(doc).OfClass(FamilySymbol).ToElements():
-                try:
-                    cat = sym.Category
-                    if cat and cat.CategoryType == CategoryType.AnnotationCategory                             and 'Tag' in cat.Name and sym.IsActive:
-                        _fallback_syms.setdefault(cat.Name, sym.Id)
-                except Exception:
-                    pass
+            _fallback_syms = self._tag_fallback_syms(doc)
         except Exception:
-            pass
+            _fallback_syms = {}
+        place = self._tag_placer(doc, view, sp)
         t = Transaction(doc, 'STINGTags Tag Selected'); t.Start()
         count = 0
+        placed = []   # (element, new tag) for the placement history
         for el in elems:
             try:
-                tag = self._place_tag(doc, view, el, sp)
+                tag = place(el)
                 if tag:
                     count += 1
+                    placed.append((el, tag))
                 else:
                     # Explicit-family path failed — try category fallback
                     try:
@@ -2933,101 +4151,55 @@ class STINGTagsPanel(WPFWindow):
                                     try: tag2.ChangeTypeId(fb_id)
                                     except Exception: pass
                                     count += 1
+                                    placed.append((el, tag2))
                     except Exception:
                         pass
             except Exception: pass
         t.Commit()
         self._organizer = None
-        # Record observations for placement history
-        doc2, _ = self._fd()
-        if doc2:
-            try:
-                view2 = doc2.ActiveView
-                for el2 in elems:
-                    try:
-                        tg2 = next(
-                            (t3 for t3 in self._view_tags(doc2, view2)
-                             if any(e2.Id == el2.Id
-                                    for e2 in t3.GetTaggedLocalElements())),
-                            None)
-                        if tg2: self._record_tag_observation(el2, tg2, view2)
-                    except Exception: pass
+        # Record observations for placement history from the tags just
+        # placed, rather than searching the view for them again
+        for el2, tg2 in placed:
+            try: self._record_tag_observation(el2, tg2, view)
             except Exception: pass
         self._log('Tagged: {} elements{}'.format(count, sym_label), '*')
 
     def TagByCategory_Click(self, s, e):
         doc, uidoc = self._fd()
         if not doc: return
-        _bic_entries = [
-            ('Lighting Fixtures',    'OST_LightingFixtures'),
-            ('Electrical Equipment', 'OST_ElectricalEquipment'),
-            ('Electrical Fixtures',  'OST_ElectricalFixtures'),
-            ('Mechanical Equipment', 'OST_MechanicalEquipment'),
-            ('Plumbing Fixtures',    'OST_PlumbingFixtures'),
-            ('Air Terminals',        'OST_DuctTerminal'),
-            ('Furniture',            'OST_Furniture'),
-            ('Doors',                'OST_Doors'),
-            ('Windows',              'OST_Windows'),
-            ('Sprinklers',           'OST_Sprinklers'),
-            ('Pipes',                'OST_PipeCurves'),
-            ('Pipe Fittings',        'OST_PipeFitting'),
-            ('Pipe Accessories',     'OST_PipeAccessory'),
-            ('Ducts',                'OST_DuctCurves'),
-            ('Duct Fittings',        'OST_DuctFitting'),
-            ('Duct Accessories',     'OST_DuctAccessory'),
-            ('Conduit',              'OST_Conduit'),
-            ('Conduit Fittings',     'OST_ConduitFitting'),
-            ('Cable Trays',          'OST_CableTray'),
-            ('Cable Tray Fittings',  'OST_CableTrayFitting'),
-            ('Flex Ducts',           'OST_FlexDuctCurves'),
-            ('Flex Pipes',           'OST_FlexPipeCurves'),
-            ('Generic Models',       'OST_GenericModel'),
-            ('Specialty Equipment',  'OST_SpecialityEquipment'),
-            ('Fire Alarm Devices',   'OST_FireAlarmDevices'),
-            ('Communication Devices','OST_CommunicationDevices'),
-            ('Rooms',                'OST_Rooms'),
-            ('Walls',                'OST_Walls'),
-            ('Floors',               'OST_Floors'),
-            ('Ceilings',             'OST_Ceilings'),
-            ('Structural Columns',   'OST_StructuralColumns'),
-            ('Structural Framing',   'OST_StructuralFraming'),
-        ]
-        cat_map = {}
-        for label, bic_name in _bic_entries:
-            try:
-                cat_map[label] = getattr(BuiltInCategory, bic_name)
-            except AttributeError: pass
         # Filter to categories that actually have elements in the current view
         view = doc.ActiveView
         available = {}
-        for label, bic in cat_map.items():
-            try:
-                count = FilteredElementCollector(doc, view.Id)\
-                    .OfCategory(bic).WhereElementIsNotElementType()\
-                    .GetElementCount()
-                if count > 0:
-                    available['{} ({})'.format(label, count)] = bic
-            except Exception: pass
+        # One multicategory pass, bucketed by category id, instead of one
+        # count query per category
+        counts = Counter()
+        try:
+            for el in FilteredElementCollector(doc, view.Id) \
+                    .WherePasses(_tag_by_cat_filter()) \
+                    .WhereElementIsNotElementType():
+                cat = el.Category
+                if cat: counts[cat.Id.IntegerValue] += 1
+        except Exception: pass
+        for label, bic in _TAG_BY_CAT_BICS:
+            count = counts.get(int(bic), 0)
+            if count > 0:
+                available['{} ({})'.format(label, count)] = bic
         if not available:
             self._log('No taggable categories found in view'); return
         picked = forms.SelectFromList.show(sorted(available), title='Tag By Category',
                                            button_name='Tag Selected Category')
         if not picked: return
-        tagged_ids = set()
-        for tag in self._view_tags(doc, view):
-            try:
-                for el in tag.GetTaggedLocalElements(): tagged_ids.add(el.Id.IntegerValue)
-            except Exception: pass
-        elems = list(FilteredElementCollector(doc, view.Id)
-                     .OfCategory(available[picked])
-                     .WhereElementIsNotElementType().ToElements())
-        sp = self._spacing()
+        # Untagged elements resolved before the transaction opens, against
+        # the shared tagged-host set and category collection
+        tagged_ids = self._tagged_host_ids(doc, view)
+        to_tag = [el for el in self._view_elems(doc, view, available[picked])
+                  if el.Id.IntegerValue not in tagged_ids]
+        place = self._tag_placer(doc, view, self._spacing())
         t = Transaction(doc, 'STINGTags Tag Category'); t.Start()
         count = 0
-        for el in elems:
-            if el.Id.IntegerValue in tagged_ids: continue
+        for el in to_tag:
             try:
-                if self._place_tag(doc, view, el, sp): count += 1
+                if place(el): count += 1
             except Exception: pass
         t.Commit()
         self._organizer = None
@@ -3038,31 +4210,33 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         view = doc.ActiveView
-        tagged_ids = set()
-        for tag in self._view_tags(doc, view):
-            try:
-                for el in tag.GetTaggedLocalElements(): tagged_ids.add(el.Id.IntegerValue)
-            except Exception: pass
-        to_tag = []
-        for bic in self._MEP_BICS:
-            try:
-                for el in FilteredElementCollector(doc, view.Id).OfCategory(bic)\
-                        .WhereElementIsNotElementType().ToElements():
-                    if el.Id.IntegerValue not in tagged_ids: to_tag.append(el)
-            except Exception: pass
+        tagged_ids = self._tagged_host_ids(doc, view)
+        try:
+            to_tag = [el for el in self._view_mep_elems(doc, view)
+                      if el.Id.IntegerValue not in tagged_ids]
+        except Exception:
+            to_tag = []
         if not to_tag: self._log('All MEP elements are already tagged'); return
         sp = self._spacing(); total = len(to_tag)
+        place = self._tag_placer(doc, view, sp)
         t = Transaction(doc, 'STINGTags Tag All Untagged'); t.Start()
         count = 0
+        # Progress painted synchronously, throttled by wall clock (~30 Hz)
+        # whatever the per-element cost; one closure reads the latest
+        # message from a shared cell, and nothing is left queued to
+        # overwrite the summary below
+        msg = ['']
+        def _upd(): self._log(msg[0], '*')
+        clock = time.time; next_ui = clock()
         for i, el in enumerate(to_tag):
             try:
-                if self._place_tag(doc, view, el, sp):
+                if place(el):
                     count += 1
             except Exception: pass
-            # Progress update every 10 elements via dispatcher repaint
-            if i % 10 == 0:
-                msg = 'Tagging… {}/{}'.format(i+1, total)
-                def _upd(m=msg): self._log(m, '*')
+            now = clock()
+            if now >= next_ui:
+                next_ui = now + 0.033
+                msg[0] = 'Tagging… {}/{}'.format(i+1, total)
                 try:
                     self._dispatch_ui(_upd)
                 except Exception: pass
@@ -3089,7 +4263,7 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         view = doc.ActiveView; orphaned = []
-        for tag in self._view_tags(doc, view):
+        for tag in self._iter_view_tags(doc, view):
             try:
                 if not list(tag.GetTaggedLocalElements()): orphaned.append(tag)
             except Exception: orphaned.append(tag)
@@ -3106,12 +4280,19 @@ class STINGTagsPanel(WPFWindow):
         if not doc: return
         try:
             view = doc.ActiveView; tags = self._view_tags(doc, view)
-            leaders = sum(1 for t in tags if t.HasLeader)
-            horiz   = sum(1 for t in tags if t.TagOrientation == TagOrientation.Horizontal)
+            # One pass over the tags; each head position is read once
+            horizontal = TagOrientation.Horizontal
+            leaders = horiz = 0
+            px, py = array('d'), array('d')
+            for t in tags:
+                if t.HasLeader: leaders += 1
+                if t.TagOrientation == horizontal: horiz += 1
+                h = t.TagHeadPosition
+                px.append(h.X); py.append(h.Y)
             sp = self._spacing()
-            clashes = sum(1 for i in range(len(tags)) for j in range(i+1, len(tags))
-                          if math.sqrt((tags[j].TagHeadPosition.X-tags[i].TagHeadPosition.X)**2
-                                      +(tags[j].TagHeadPosition.Y-tags[i].TagHeadPosition.Y)**2) < sp)
+            # Pairs closer than sp, from a spacing-sized grid: each pair is
+            # counted by both ends
+            clashes = sum(_grid_neighbour_counts(px, py, sp)) // 2
             self._log('TAG AUDIT  —  view: {}\nTotal: {}  Leaders: {}\n'
                       'Horizontal: {}  Vertical: {}\nClashes (< {:.2f}ft): {}'.format(
                           view.Name, len(tags), leaders, horiz, len(tags)-horiz, sp, clashes), '[Chart]')
@@ -3128,9 +4309,11 @@ class STINGTagsPanel(WPFWindow):
         if not tags:
             self._log('No tags in view — nothing to export'); return
         try:
-            # Build rows
-            rows = []
-            pts = []
+            # One pass over the tags into flat columns; the NN distance
+            # needs every head before the first row can be written
+            horiz = TagOrientation.Horizontal
+            meta = []
+            px, py = array('d'), array('d')
             for tag in tags:
                 try:
                     h   = tag.TagHeadPosition
@@ -3141,40 +4324,32 @@ class STINGTagsPanel(WPFWindow):
                             cat = hosts[0].Category.Name if hosts[0].Category else ''
                     except Exception:
                         pass
-                    rows.append({
-                        'Id':          tag.Id.IntegerValue,
-                        'Category':    cat,
-                        'HasLeader':   '1' if tag.HasLeader else '0',
-                        'Orientation': 'H' if tag.TagOrientation == TagOrientation.Horizontal else 'V',
-                        'X':           round(h.X, 4),
-                        'Y':           round(h.Y, 4),
-                    })
-                    pts.append((h.X, h.Y))
+                    meta.append((tag.Id.IntegerValue, cat,
+                                 '1' if tag.HasLeader else '0',
+                                 'H' if tag.TagOrientation == horiz else 'V'))
+                    px.append(h.X); py.append(h.Y)
                 except Exception:
                     pass
 
-            # Nearest-neighbour distances
-            for i, row in enumerate(rows):
-                min_d = float('inf')
-                xi, yi = pts[i]
-                for j, (xj, yj) in enumerate(pts):
-                    if i == j: continue
-                    d = math.sqrt((xj - xi) ** 2 + (yj - yi) ** 2)
-                    if d < min_d:
-                        min_d = d
-                row['NN_dist_ft'] = round(min_d, 4) if min_d < float('inf') else ''
-
-            # Write CSV
+            # Nearest-neighbour distances from a grid ring search; sqrt
+            # once, for the winner only
+            nn_d2 = _grid_nearest_d2(px, py)
+            inf = float('inf')
+
+            # Write CSV, rows generated as the writer consumes them
             fname = 'STINGTags_Audit_{}.csv'.format(
                 view.Name.replace(' ', '_').replace('/', '-'))
             out_path = os.path.join(tempfile.gettempdir(), fname)
             fields = ['Id', 'Category', 'HasLeader', 'Orientation', 'X', 'Y', 'NN_dist_ft']
-            with io.open(out_path, 'w', newline='') as f:
-                w = _csv.DictWriter(f, fieldnames=fields)
-                w.writeheader()
-                w.writerows(rows)
+            with io.open(out_path, 'w', newline='', buffering=1 << 16) as f:
+                w = _csv.writer(f)
+                w.writerow(fields)
+                w.writerows(
+                    (m[0], m[1], m[2], m[3], round(x, 4), round(y, 4),
+                     round(math.sqrt(d2), 4) if d2 < inf else '')
+                    for m, x, y, d2 in zip(meta, px, py, nn_d2))
 
-            self._log('Audit CSV: {} tags → {}'.format(len(rows), out_path), '[List]')
+            self._log('Audit CSV: {} tags → {}'.format(len(meta), out_path), '[List]')
             try:
                 self._open_folder(out_path)
             except Exception: pass
@@ -3219,9 +4394,19 @@ class STINGTagsPanel(WPFWindow):
                     for cy in range(cy0, cy1+1):
                         grid.setdefault((cx, cy), []).append(idx)
 
-            # Check only candidates sharing a grid cell
             clashing = set()
             checked = set()
+            n = len(tagged_boxes)
+            if grid and max(len(v) for v in grid.values()) > math.sqrt(n):
+                # Dense cluster: the grid has collapsed towards all-pairs,
+                # so sort and sweep along X instead
+                cols = tuple(zip(*tagged_boxes))
+                for ia, ib in _sweep_box_pairs(*cols[1:]):
+                    clashing.add(cols[0][ia].Id)
+                    clashing.add(cols[0][ib].Id)
+                grid = {}
+
+            # Check only candidates sharing a grid cell
             for cell_idxs in grid.values():
                 for a in range(len(cell_idxs)):
                     for b in range(a+1, len(cell_idxs)):
@@ -3411,21 +4596,30 @@ class STINGTagsPanel(WPFWindow):
         tags = self._sel_tags(doc, uidoc)
         if not tags: self._log('Select tags first'); return
         view = doc.ActiveView
-        all_pts = [Vec2(t.TagHeadPosition.X, t.TagHeadPosition.Y) for t in self._view_tags(doc, view)]
-        sp = self._spacing(); self._push_undo(tags)
-        t = Transaction(doc, 'STINGTags Smart Offset'); t.Start()
+        px, py = array('d'), array('d')
+        for vt in self._iter_view_tags(doc, view):
+            h = vt.TagHeadPosition
+            px.append(h.X); py.append(h.Y)
+        sp = self._spacing(); reach = sp * 2 or 1e-6
+        # Congestion = tag heads within 2x spacing; cells of that size
+        # mean each candidate only looks at its 3x3 block of cells
+        grid = _build_grid(px, py, reach)
+        moves = []
         for tag in tags:
             try:
                 hosts = list(tag.GetTaggedLocalElements())
                 c = self._bb_center(hosts[0], view) if hosts else None
                 if not c: continue
-                hz = tag.TagHeadPosition.Z
-                candidates = [XYZ(c.X+sp,c.Y,hz), XYZ(c.X-sp,c.Y,hz),
-                              XYZ(c.X,c.Y+sp,hz), XYZ(c.X,c.Y-sp,hz)]
-                def congestion(pos):
-                    return sum(1 for p in all_pts
-                               if math.sqrt((p.x-pos.X)**2+(p.y-pos.Y)**2) < sp*2)
-                tag.TagHeadPosition = min(candidates, key=congestion)
+                candidates = ((c.X+sp, c.Y), (c.X-sp, c.Y),
+                              (c.X, c.Y+sp), (c.X, c.Y-sp))
+                x, y = min(candidates, key=lambda p: _grid_count_within(
+                    grid, px, py, reach, p[0], p[1]))
+                moves.append((tag, XYZ(x, y, tag.TagHeadPosition.Z)))
+            except Exception: pass
+        self._push_undo(tags)
+        t = Transaction(doc, 'STINGTags Smart Offset'); t.Start()
+        for tag, p in moves:
+            try: tag.TagHeadPosition = p
             except Exception: pass
         t.Commit()
         self._log('Smart Offset: {} tags in least-congested quadrant'.format(len(tags)), '[Brain]')
@@ -3439,34 +4633,31 @@ class STINGTagsPanel(WPFWindow):
             self._log('Select 2+ tags to align')
             return
         positions = [(tag, tag.TagHeadPosition) for tag in tags]
+        if direction == 'left':
+            tgt = min(p.X for _, p in positions)
+        elif direction == 'right':
+            tgt = max(p.X for _, p in positions)
+        elif direction == 'top':
+            tgt = max(p.Y for _, p in positions)
+        elif direction == 'bottom':
+            tgt = min(p.Y for _, p in positions)
+        elif direction == 'centerh':
+            tgt = sum(p.X for _, p in positions) / len(positions)
+        elif direction == 'centerv':
+            tgt = sum(p.Y for _, p in positions) / len(positions)
+        else:
+            return
+        # New heads are built up front; the transaction only assigns them
+        if direction in ('left', 'right', 'centerh'):
+            moves = [(tg, XYZ(tgt, h.Y, h.Z)) for tg, h in positions]
+        else:
+            moves = [(tg, XYZ(h.X, tgt, h.Z)) for tg, h in positions]
         self._push_undo(tags)
         t = Transaction(doc, 'STINGTags Align')
         t.Start()
         try:
-            if direction == 'left':
-                tgt = min(p.X for _, p in positions)
-                for tg, h in positions:
-                    tg.TagHeadPosition = XYZ(tgt, h.Y, h.Z)
-            elif direction == 'right':
-                tgt = max(p.X for _, p in positions)
-                for tg, h in positions:
-                    tg.TagHeadPosition = XYZ(tgt, h.Y, h.Z)
-            elif direction == 'top':
-                tgt = max(p.Y for _, p in positions)
-                for tg, h in positions:
-                    tg.TagHeadPosition = XYZ(h.X, tgt, h.Z)
-            elif direction == 'bottom':
-                tgt = min(p.Y for _, p in positions)
-                for tg, h in positions:
-                    tg.TagHeadPosition = XYZ(h.X, tgt, h.Z)
-            elif direction == 'centerh':
-                tgt = sum(p.X for _, p in positions) / len(positions)
-                for tg, h in positions:
-                    tg.TagHeadPosition = XYZ(tgt, h.Y, h.Z)
-            elif direction == 'centerv':
-                tgt = sum(p.Y for _, p in positions) / len(positions)
-                for tg, h in positions:
-                    tg.TagHeadPosition = XYZ(h.X, tgt, h.Z)
+            for tg, p in moves:
+                tg.TagHeadPosition = p
             t.Commit()
             self._log('Aligned {}: {} tags'.format(direction, len(tags)))
         except Exception as ex:
@@ -3489,16 +4680,18 @@ class STINGTagsPanel(WPFWindow):
             self._log('Select 3+ tags to distribute')
             return
         try:
-            st = sorted(tags, key=lambda t: t.TagHeadPosition.X)
-            x1 = st[0].TagHeadPosition.X
-            x2 = st[-1].TagHeadPosition.X
+            st = sorted(((tg, tg.TagHeadPosition) for tg in tags),
+                        key=lambda th: th[1].X)
+            x1 = st[0][1].X
+            x2 = st[-1][1].X
             step = (x2 - x1) / max(1, len(st) - 1)
+            moves = [(tag, XYZ(x1 + step * i, h.Y, h.Z))
+                     for i, (tag, h) in enumerate(st)]
             self._push_undo(tags)
             t = Transaction(doc, 'STINGTags Distribute H')
             t.Start()
-            for i, tag in enumerate(st):
-                h = tag.TagHeadPosition
-                tag.TagHeadPosition = XYZ(x1 + step * i, h.Y, h.Z)
+            for tag, p in moves:
+                tag.TagHeadPosition = p
             t.Commit()
             self._log('Distribute H: {} tags, {:.2f}ft spread'.format(
                 len(tags), x2 - x1))
@@ -3513,16 +4706,18 @@ class STINGTagsPanel(WPFWindow):
             self._log('Select 3+ tags to distribute')
             return
         try:
-            st = sorted(tags, key=lambda t: t.TagHeadPosition.Y)
-            y1 = st[0].TagHeadPosition.Y
-            y2 = st[-1].TagHeadPosition.Y
+            st = sorted(((tg, tg.TagHeadPosition) for tg in tags),
+                        key=lambda th: th[1].Y)
+            y1 = st[0][1].Y
+            y2 = st[-1][1].Y
             step = (y2 - y1) / max(1, len(st) - 1)
+            moves = [(tag, XYZ(h.X, y1 + step * i, h.Z))
+                     for i, (tag, h) in enumerate(st)]
             self._push_undo(tags)
             t = Transaction(doc, 'STINGTags Distribute V')
             t.Start()
-            for i, tag in enumerate(st):
-                h = tag.TagHeadPosition
-                tag.TagHeadPosition = XYZ(h.X, y1 + step * i, h.Z)
+            for tag, p in moves:
+                tag.TagHeadPosition = p
             t.Commit()
             self._log('Distribute V: {} tags, {:.2f}ft spread'.format(
                 len(tags), y2 - y1))
@@ -3539,14 +4734,16 @@ class STINGTagsPanel(WPFWindow):
             return
         try:
             sp = self._spacing()
-            st = sorted(tags, key=lambda t: t.TagHeadPosition.X)
-            base_x = st[0].TagHeadPosition.X
+            st = sorted(((tg, tg.TagHeadPosition) for tg in tags),
+                        key=lambda th: th[1].X)
+            base_x = st[0][1].X
+            moves = [(tag, XYZ(base_x + i * sp, h.Y, h.Z))
+                     for i, (tag, h) in enumerate(st)]
             self._push_undo(tags)
             t = Transaction(doc, 'STINGTags Dist Fixed H')
             t.Start()
-            for i, tag in enumerate(st):
-                h = tag.TagHeadPosition
-                tag.TagHeadPosition = XYZ(base_x + i * sp, h.Y, h.Z)
+            for tag, p in moves:
+                tag.TagHeadPosition = p
             t.Commit()
             self._log('Fixed H: {} tags, {:.3f}ft pitch'.format(len(tags), sp))
         except Exception as ex:
@@ -3562,14 +4759,16 @@ class STINGTagsPanel(WPFWindow):
             return
         try:
             sp = self._spacing()
-            st = sorted(tags, key=lambda t: -t.TagHeadPosition.Y)
-            base_y = st[0].TagHeadPosition.Y
+            st = sorted(((tg, tg.TagHeadPosition) for tg in tags),
+                        key=lambda th: -th[1].Y)
+            base_y = st[0][1].Y
+            moves = [(tag, XYZ(h.X, base_y - i * sp, h.Z))
+                     for i, (tag, h) in enumerate(st)]
             self._push_undo(tags)
             t = Transaction(doc, 'STINGTags Dist Fixed V')
             t.Start()
-            for i, tag in enumerate(st):
-                h = tag.TagHeadPosition
-                tag.TagHeadPosition = XYZ(h.X, base_y - i * sp, h.Z)
+            for tag, p in moves:
+                tag.TagHeadPosition = p
             t.Commit()
             self._log('Fixed V: {} tags, {:.3f}ft pitch'.format(len(tags), sp))
         except Exception as ex:
@@ -3580,22 +4779,24 @@ class STINGTagsPanel(WPFWindow):
         try:
             tags = self._sel_tags(doc, uidoc)
             if len(tags) < 3: self._log('Select 3+ tags'); return
-            sp = self._spacing(); rows = {}
-            for tag in tags:
-                h = tag.TagHeadPosition
-                bucket = round(round(h.Y/sp)*sp, 6)
-                rows.setdefault(bucket, []).append((tag, h))
+            sp = self._spacing()
+            # Integer row ids with running sums and counts: one pass to
+            # bucket, one to emit, no per-row member lists
+            heads = [(tag, tag.TagHeadPosition) for tag in tags]
+            bids = [int(round(h.Y/sp)) for _, h in heads]
+            sums = Counter(); counts = Counter()
+            for b, (_, h) in zip(bids, heads):
+                sums[b] += h.Y; counts[b] += 1
+            means = dict((b, sums[b]/counts[b]) for b in counts if counts[b] > 1)
+            moves = [(tag, XYZ(h.X, means[b], h.Z))
+                     for b, (tag, h) in zip(bids, heads) if b in means]
             self._push_undo(tags)
             t = Transaction(doc, 'STINGTags Smart Align'); t.Start()
-            aligned = 0
-            for members in rows.values():
-                if len(members) > 1:
-                    avg_y = sum(h.Y for _,h in members)/len(members)
-                    for tag, h in members:
-                        tag.TagHeadPosition = XYZ(h.X, avg_y, h.Z); aligned += 1
+            for tag, p in moves:
+                tag.TagHeadPosition = p
             t.Commit()
             self._log('Smart Align: {} tags across {} rows'.format(
-                aligned, sum(1 for m in rows.values() if len(m)>1)), '[Brain]')
+                len(moves), len(means)), '[Brain]')
 
         except Exception as ex:
             self._log(str(ex))
@@ -3612,10 +4813,12 @@ class STINGTagsPanel(WPFWindow):
             min_y = min(p.Y for _,p in positions); max_y = max(p.Y for _,p in positions)
             step_x = (max_x-min_x)/max(1,cols-1)
             step_y = (max_y-min_y)/max(1,rows_count-1) if rows_count>1 else step_x
+            moves = [(tag, XYZ(min_x+(i%cols)*step_x, max_y-(i//cols)*step_y, pos.Z))
+                     for i, (tag, pos) in enumerate(positions)]
             self._push_undo(tags)
             t = Transaction(doc, 'STINGTags To Grid'); t.Start()
-            for i, (tag, pos) in enumerate(positions):
-                tag.TagHeadPosition = XYZ(min_x+(i%cols)*step_x, max_y-(i//cols)*step_y, pos.Z)
+            for tag, p in moves:
+                tag.TagHeadPosition = p
             t.Commit()
             self._log('Grid {}×{}: {} tags'.format(cols, rows_count, len(tags)))
 
@@ -3631,11 +4834,13 @@ class STINGTagsPanel(WPFWindow):
             cx = sum(p.X for p in hp)/len(hp); cy = sum(p.Y for p in hp)/len(hp)
             radius = max((math.sqrt((p.X-cx)**2+(p.Y-cy)**2) for p in hp), default=self._spacing()*2)
             if radius < 0.01: radius = self._spacing()*2
+            step = 2*math.pi/len(tags)
+            moves = [(tag, XYZ(cx+radius*math.cos(step*i), cy+radius*math.sin(step*i), h.Z))
+                     for i, (tag, h) in enumerate(zip(tags, hp))]
             self._push_undo(tags)
             t = Transaction(doc, 'STINGTags To Circle'); t.Start()
-            for i, tag in enumerate(tags):
-                angle = 2*math.pi*i/len(tags); h = tag.TagHeadPosition
-                tag.TagHeadPosition = XYZ(cx+radius*math.cos(angle), cy+radius*math.sin(angle), h.Z)
+            for tag, p in moves:
+                tag.TagHeadPosition = p
             t.Commit()
             self._log('Circle: {} tags (r={:.2f}ft)'.format(len(tags), radius))
 
@@ -3657,24 +4862,23 @@ class STINGTagsPanel(WPFWindow):
             self._log('Select 2+ tags')
             return
         sp = self._spacing()
+        heads = [(tag, tag.TagHeadPosition) for tag in tags]
+        if direction == 'V':
+            heads.sort(key=lambda th: -th[1].Y)
+            base_x, base_y = heads[0][1].X, heads[0][1].Y
+            moves = [(tag, XYZ(base_x, base_y - i * sp, h.Z))
+                     for i, (tag, h) in enumerate(heads)]
+        else:
+            heads.sort(key=lambda th: th[1].X)
+            base_x, base_y = heads[0][1].X, heads[0][1].Y
+            moves = [(tag, XYZ(base_x + i * sp, base_y, h.Z))
+                     for i, (tag, h) in enumerate(heads)]
         self._push_undo(tags)
         t = Transaction(doc, 'STINGTags Stack {}'.format(direction))
         t.Start()
         try:
-            if direction == 'V':
-                sorted_tags = sorted(tags, key=lambda tg: -tg.TagHeadPosition.Y)
-                base_x = sorted_tags[0].TagHeadPosition.X
-                base_y = sorted_tags[0].TagHeadPosition.Y
-                for i, tag in enumerate(sorted_tags):
-                    h = tag.TagHeadPosition
-                    tag.TagHeadPosition = XYZ(base_x, base_y - i * sp, h.Z)
-            else:
-                sorted_tags = sorted(tags, key=lambda tg: tg.TagHeadPosition.X)
-                base_x = sorted_tags[0].TagHeadPosition.X
-                base_y = sorted_tags[0].TagHeadPosition.Y
-                for i, tag in enumerate(sorted_tags):
-                    h = tag.TagHeadPosition
-                    tag.TagHeadPosition = XYZ(base_x + i * sp, base_y, h.Z)
+            for tag, p in moves:
+                tag.TagHeadPosition = p
             t.Commit()
             self._log('Stacked {}: {} tags @ {:.3f}ft'.format(
                 direction, len(tags), sp))
@@ -3893,7 +5097,7 @@ class STINGTagsPanel(WPFWindow):
                         c = _get_host_center(tg, view)
                         if c:
                             h = tg.TagHeadPosition
-                            d = math.sqrt((h.X - c.X)**2 + (h.Y - c.Y)**2)
+                            d = (h.X - c.X)**2 + (h.Y - c.Y)**2   # squared
                             if d < best_dist:
                                 best_dist = d
                                 best = tg
@@ -4056,9 +5260,10 @@ class STINGTagsPanel(WPFWindow):
             for tag in tags:
                 try:
                     h = tag.TagHeadPosition
+                    ref = _get_tagged_ref(tag) if _LEADER_API_REF else None
                     end_pt = _get_host_center(tag, view)
                     if end_pt is None:
-                        end_pt = _get_leader_end(tag)
+                        end_pt = _get_leader_end(tag, ref)
                     if end_pt is None:
                         if first_err is None:
                             first_err = 'No host/end for tag {}'.format(
@@ -4068,7 +5273,7 @@ class STINGTagsPanel(WPFWindow):
                     straight_pt = XYZ(
                         h.X + (end_pt.X - h.X) * frac,
                         h.Y + (end_pt.Y - h.Y) * frac, h.Z)
-                    if _set_elbow(tag, straight_pt):
+                    if _set_elbow(tag, straight_pt, ref):
                         straightened += 1
                     elif first_err is None:
                         first_err = 'SetElbow failed tag {}'.format(
@@ -4108,9 +5313,10 @@ class STINGTagsPanel(WPFWindow):
                             first_err = 'No host for tag {}'.format(
                                 tag.Id.IntegerValue)
                         continue
-                    elbow = _get_elbow(tag)
+                    ref = _get_tagged_ref(tag) if _LEADER_API_REF else None
+                    elbow = _get_elbow(tag, ref)
                     if elbow is None:
-                        elbow = _create_elbow_at_midpoint(tag, view, 0.25)
+                        elbow = _create_elbow_at_midpoint(tag, view, 0.25, ref)
                     if elbow is None:
                         if first_err is None:
                             first_err = 'Cannot create elbow tag {}'.format(
@@ -4130,7 +5336,7 @@ class STINGTagsPanel(WPFWindow):
                         2.0 * proj_x - elbow.X,
                         2.0 * proj_y - elbow.Y,
                         elbow.Z)
-                    if _set_elbow(tag, new_elbow):
+                    if _set_elbow(tag, new_elbow, ref):
                         flipped += 1
                     elif first_err is None:
                         first_err = 'SetElbow failed tag {}'.format(
@@ -4261,17 +5467,18 @@ class STINGTagsPanel(WPFWindow):
                         opt_a = XYZ(c.X, h.Y, h.Z)  # horizontal from tag, vertical to host
                         opt_b = XYZ(h.X, c.Y, h.Z)  # vertical from tag, horizontal to host
                         # Use whichever keeps the elbow closer to a current elbow (if any)
-                        cur_elbow = _get_elbow(tag)
+                        ref = _get_tagged_ref(tag) if _LEADER_API_REF else None
+                        cur_elbow = _get_elbow(tag, ref)
                         if cur_elbow:
-                            da = math.sqrt((cur_elbow.X - opt_a.X) ** 2 +
-                                           (cur_elbow.Y - opt_a.Y) ** 2)
-                            db = math.sqrt((cur_elbow.X - opt_b.X) ** 2 +
-                                           (cur_elbow.Y - opt_b.Y) ** 2)
+                            da = ((cur_elbow.X - opt_a.X) ** 2 +
+                                  (cur_elbow.Y - opt_a.Y) ** 2)
+                            db = ((cur_elbow.X - opt_b.X) ** 2 +
+                                  (cur_elbow.Y - opt_b.Y) ** 2)
                             elbow_pt = opt_a if da <= db else opt_b
                         else:
                             # Default: horizontal from tag (most common in drawings)
                             elbow_pt = opt_a
-                        if _set_elbow(tag, elbow_pt):
+                        if _set_elbow(tag, elbow_pt, ref):
                             ok += 1
                         elif first_err is None:
                             first_err = 'SetElbow failed (90°)'
@@ -4448,13 +5655,14 @@ class STINGTagsPanel(WPFWindow):
         view = doc.ActiveView
         # Get all existing tag positions in view for density check
         all_pts = []
-        for vt in self._view_tags(doc, view):
+        for vt in self._iter_view_tags(doc, view):
             try:
                 p = vt.TagHeadPosition
                 all_pts.append((p.X, p.Y))
             except Exception:
                 pass
         sp = self._spacing()
+        r2 = (sp * 1.5) ** 2   # density radius, squared
         self._push_undo(tags)
         t = Transaction(doc, 'STINGTags Smart Leader')
         t.Start()
@@ -4476,8 +5684,8 @@ class STINGTagsPanel(WPFWindow):
                         # Count how many tags are near this candidate position
                         density = 0
                         for ax, ay in all_pts:
-                            d = math.sqrt((ax - nx) ** 2 + (ay - ny) ** 2)
-                            if d < sp * 1.5:
+                            dx = ax - nx; dy = ay - ny
+                            if dx * dx + dy * dy < r2:
                                 density += 1
                         if density < best_density:
                             best_density = density
@@ -4598,7 +5806,8 @@ class STINGTagsPanel(WPFWindow):
             for tag in tags:
                 try:
                     h = tag.TagHeadPosition
-                    end_pt = _get_leader_end(tag)
+                    ref = _get_tagged_ref(tag) if _LEADER_API_REF else None
+                    end_pt = _get_leader_end(tag, ref)
                     if end_pt is None:
                         end_pt = _get_host_center(tag, view)
                     if end_pt is None:
@@ -4606,7 +5815,7 @@ class STINGTagsPanel(WPFWindow):
                     frac = 1.0 / 3.0
                     sp = XYZ(h.X + (end_pt.X - h.X) * frac,
                              h.Y + (end_pt.Y - h.Y) * frac, h.Z)
-                    if _set_elbow(tag, sp):
+                    if _set_elbow(tag, sp, ref):
                         straightened += 1
                 except Exception:
                     pass
@@ -4708,29 +5917,24 @@ class STINGTagsPanel(WPFWindow):
         if not doc: return
         view = doc.ActiveView; tags = self._view_tags(doc, view)
         if len(tags) < 2: self._log('Need 2+ tags'); return
-        sp = self._spacing()
-        hp = [Vec2(t.TagHeadPosition.X, t.TagHeadPosition.Y) for t in tags]
-        overlaps = sum(1 for i in range(len(hp)) for j in range(i+1, len(hp))
-                       if hp[i].dist(hp[j]) < sp)
+        sp = self._spacing(); sp2 = sp * sp
+        a = self._tag_arrays(tags, view)
+        tx, ty = a.tx, a.ty
+        overlaps = sum(1 for i, j in _grid_pairs(_build_grid(tx, ty, sp))
+                       if (tx[i]-tx[j])**2 + (ty[i]-ty[j])**2 < sp2)
         overlap_score = max(0, 100-overlaps*5)
-        leader_tags = [t for t in tags if t.HasLeader]; ldr_score = 100
-        if leader_tags:
-            ldr_total = 0
-            for tag in leader_tags:
-                try:
-                    hosts = list(tag.GetTaggedLocalElements())
-                    c = self._bb_center(hosts[0], view) if hosts else None
-                    if c:
-                        h = tag.TagHeadPosition
-                        ldr_total += math.sqrt((h.X-c.X)**2+(h.Y-c.Y)**2)
-                except Exception: pass
-            avg_ldr = ldr_total/len(leader_tags)
+        ldr_rows = [i for i, t in enumerate(a.tags) if t.HasLeader]; ldr_score = 100
+        if ldr_rows:
+            # Unhosted rows carry ex/ey == head, so they add zero length
+            ldr_total = sum(math.sqrt((tx[i]-a.ex[i])**2 + (ty[i]-a.ey[i])**2)
+                            for i in ldr_rows)
+            avg_ldr = ldr_total/len(ldr_rows)
             ldr_score = max(0, 100-max(0, avg_ldr-sp)*20)
         composite = int((overlap_score+ldr_score)/2)
         self._log('LAYOUT SCORE: {}/100\nOverlap: {}/100  Leader: {}/100\n'
                   'Tags: {}  Clashes: {}  Leaders: {}'.format(
                       composite, int(overlap_score), int(ldr_score),
-                      len(tags), overlaps, len(leader_tags)), '[Chart]')
+                      len(tags), overlaps, len(ldr_rows)), '[Chart]')
 
     def CheckClashes_Click(self, s, e):
         doc, uidoc = self._fd()
@@ -4738,9 +5942,13 @@ class STINGTagsPanel(WPFWindow):
         try:
             view = doc.ActiveView; tags = self._view_tags(doc, view); sp = self._spacing()
             if not tags: self._log('No tags in view'); return
-            clashes = sum(1 for i in range(len(tags)) for j in range(i+1, len(tags))
-                          if math.sqrt((tags[j].TagHeadPosition.X-tags[i].TagHeadPosition.X)**2
-                                      +(tags[j].TagHeadPosition.Y-tags[i].TagHeadPosition.Y)**2) < sp)
+            tx = array('d'); ty = array('d')
+            for t in tags:
+                h = t.TagHeadPosition
+                tx.append(h.X); ty.append(h.Y)
+            sp2 = sp * sp
+            clashes = sum(1 for i, j in _grid_pairs(_build_grid(tx, ty, sp))
+                          if (tx[i]-tx[j])**2 + (ty[i]-ty[j])**2 < sp2)
             self._log('Clashes: {} pairs (d < {:.2f}ft)\nTotal: {} tags'.format(
                 clashes, sp, len(tags)))
         except Exception as ex:
@@ -4750,7 +5958,7 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         view = doc.ActiveView
-        leader_tags = [t for t in self._view_tags(doc, view) if t.HasLeader]
+        leader_tags = [t for t in self._iter_view_tags(doc, view) if t.HasLeader]
         self._log('Leaders in view: {}\nUse Uncross to resolve crossings'.format(len(leader_tags)))
 
     def DensityMap_Click(self, s, e):
@@ -4858,15 +6066,13 @@ class STINGTagsPanel(WPFWindow):
                     # ISO completeness check (no transaction needed)
                     total_p = len(self._ISO_PARAMS)
                     if self._ISO_LIBS:
-                        elements = []
-                        for bic in self._MEP_BICS:
-                            try:
-                                elements.extend(
-                                    FilteredElementCollector(doc, view.Id)
-                                    .OfCategory(bic)
-                                    .WhereElementIsNotElementType().ToElements())
-                            except Exception:
-                                pass
+                        try:
+                            elements = list(
+                                FilteredElementCollector(doc, view.Id)
+                                .WherePasses(_mep_filter())
+                                .WhereElementIsNotElementType().ToElements())
+                        except Exception:
+                            elements = []
                         if elements:
                             filled = sum(1 for el in elements
                                          for p in self._ISO_PARAMS
@@ -4930,25 +6136,44 @@ class STINGTagsPanel(WPFWindow):
                 except Exception: return ''
             if self._iso_scope == 'project':
                 return [(el, _cat_name(el)) for el in self._TL.iter_taggable(doc, self._TC)]
-            coll = (uidoc.Selection.GetElementIds() if self._iso_scope == 'selection'
-                    else FilteredElementCollector(doc, view.Id)
-                         .WhereElementIsNotElementType().ToElementIds())
-            return [(doc.GetElement(eid), _cat_name(doc.GetElement(eid)))
-                    for eid in coll
-                    if doc.GetElement(eid) and
-                    _cat_name(doc.GetElement(eid)) in disc_map]
+            if self._iso_scope == 'selection':
+                coll = (doc.GetElement(eid)
+                        for eid in uidoc.Selection.GetElementIds())
+            else:
+                coll = FilteredElementCollector(doc, view.Id) \
+                    .WhereElementIsNotElementType()
+            result = []
+            for el in coll:
+                if el:
+                    cname = _cat_name(el)
+                    if cname in disc_map: result.append((el, cname))
+            return result
         result = []
-        for bic in self._MEP_BICS:
-            try:
-                coll = (FilteredElementCollector(doc) if self._iso_scope == 'project'
-                        else FilteredElementCollector(doc, view.Id))
-                for el in coll.OfCategory(bic).WhereElementIsNotElementType().ToElements():
-                    cat = el.Category
-                    result.append((el, cat.Name if cat else ''))
-            except Exception: pass
         if self._iso_scope == 'selection':
-            sel_ids = set(eid.IntegerValue for eid in uidoc.Selection.GetElementIds())
-            result = [(el,c) for el,c in result if el.Id.IntegerValue in sel_ids]
+            # Test the selection against the MEP category ids directly rather
+            # than collecting every MEP element in the view and filtering
+            mep_ids = self._MEP_BIC_IDS
+            for eid in uidoc.Selection.GetElementIds():
+                try:
+                    el  = doc.GetElement(eid)
+                    cat = el.Category if el else None
+                    if cat and cat.Id.IntegerValue in mep_ids:
+                        result.append((el, cat.Name))
+                except Exception: pass
+            return result
+        # One multicategory pass, regrouped in _MEP_BICS order so callers
+        # see the same sequence as the former per-category collectors
+        by_cat = {}
+        try:
+            coll = (FilteredElementCollector(doc) if self._iso_scope == 'project'
+                    else FilteredElementCollector(doc, view.Id))
+            for el in coll.WherePasses(_mep_filter()).WhereElementIsNotElementType():
+                cat = el.Category
+                if cat:
+                    by_cat.setdefault(cat.Id.IntegerValue, []).append((el, cat.Name))
+        except Exception: pass
+        for bic in self._MEP_BICS:
+            result.extend(by_cat.get(int(bic), ()))
         return result
 
     def IsoLoadParams_Click(self, s, e):
@@ -7647,8 +8872,8 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         ids = list(uidoc.Selection.GetElementIds())
-        tags = [doc.GetElement(eid) for eid in ids
-                if isinstance(doc.GetElement(eid), IndependentTag)]
+        tags = [el for el in (doc.GetElement(eid) for eid in ids)
+                if isinstance(el, IndependentTag)]
         if len(tags) < 2: self._log('Select 2+ tags — first is the source'); return
         src = tags[0]
         try:
@@ -7884,7 +9109,7 @@ class STINGTagsPanel(WPFWindow):
         try:
             db_path = os.path.join(_data, 'param_db.json')
             with io.open(db_path, encoding='utf-8') as f:
-                self._param_db = json.load(f)
+                self._param_db = _json_fast.load(f)
         except Exception:
             self._param_db = {}
         return self._param_db
@@ -8924,9 +10149,8 @@ class STINGTagsPanel(WPFWindow):
         if not pname: self._log('Pick a parameter from the dropdown'); return
         ids = list(uidoc.Selection.GetElementIds())
         if not ids: self._log('Select elements first'); return
-        count = sum(1 for eid in ids
-                    if doc.GetElement(eid) and
-                    doc.GetElement(eid).LookupParameter(pname))
+        count = sum(1 for el in (doc.GetElement(eid) for eid in ids)
+                    if el and el.LookupParameter(pname))
         self.BulkParamStatus.Text = '{}/{} elements have "{}"'.format(count, len(ids), pname)
         self._log('[Bulk] {} has param "{}": {}/{}'.format(
             'Selection', pname, count, len(ids)), '✏')
@@ -9090,12 +10314,12 @@ class STINGTagsPanel(WPFWindow):
     def _get_room_tags(self, doc, uidoc):
         # (module-level import)
         ids = list(uidoc.Selection.GetElementIds())
-        tags = [doc.GetElement(eid) for eid in ids
-                if isinstance(doc.GetElement(eid), SpatialElementTag)]
+        tags = [el for el in (doc.GetElement(eid) for eid in ids)
+                if isinstance(el, SpatialElementTag)]
         if not tags:
             # Try rooms — find their tags
-            rooms = [doc.GetElement(eid) for eid in ids
-                     if isinstance(doc.GetElement(eid), SpatialElement)]
+            rooms = [el for el in (doc.GetElement(eid) for eid in ids)
+                     if isinstance(el, SpatialElement)]
             view = doc.ActiveView
             all_tags = list(FilteredElementCollector(doc, view.Id)
                             .OfClass(SpatialElementTag).ToElements())
@@ -9153,8 +10377,8 @@ class STINGTagsPanel(WPFWindow):
         if not doc: return
         # (module-level import)
         ids = list(uidoc.Selection.GetElementIds())
-        tags = [doc.GetElement(eid) for eid in ids
-                if isinstance(doc.GetElement(eid), IndependentTag)]
+        tags = [el for el in (doc.GetElement(eid) for eid in ids)
+                if isinstance(el, IndependentTag)]
         if not tags: self._log('Select tags with leaders'); return
         t = Transaction(doc, 'STINGTags Lock Leader End'); t.Start()
         count = 0
@@ -9177,8 +10401,8 @@ class STINGTagsPanel(WPFWindow):
         if not doc: return
         # (module-level import)
         ids = list(uidoc.Selection.GetElementIds())
-        tags = [doc.GetElement(eid) for eid in ids
-                if isinstance(doc.GetElement(eid), IndependentTag)]
+        tags = [el for el in (doc.GetElement(eid) for eid in ids)
+                if isinstance(el, IndependentTag)]
         t = Transaction(doc, 'STINGTags Free Leader End'); t.Start()
         count = 0
         for tag in tags:
@@ -9308,8 +10532,8 @@ class STINGTagsPanel(WPFWindow):
         doc, uidoc = self._fd()
         if not doc: return
         ids = list(uidoc.Selection.GetElementIds())
-        sheets = [doc.GetElement(eid) for eid in ids
-                  if isinstance(doc.GetElement(eid), ViewSheet)]
+        sheets = [el for el in (doc.GetElement(eid) for eid in ids)
+                  if isinstance(el, ViewSheet)]
         if not sheets: self._log('Select sheet(s) first'); return
         folder = tempfile.gettempdir()
         try:
@@ -9361,7 +10585,6 @@ class STINGTagsPanel(WPFWindow):
         try:
             from Autodesk.Revit.DB import ScheduleDefinition, ScheduleFieldType
             from Autodesk.Revit.DB import ViewSchedule, SchedulableField
-            from Autodesk.Revit.DB import BuiltInParameter as BIP
             t = Transaction(doc, 'STINGTags Sheet Index'); t.Start()
             sched = ViewSchedule.CreateSheetList(doc)
             sched.Name = 'STINGTags Sheet Index' + (' — ' + prefix if prefix else '')
@@ -9390,7 +10613,6 @@ class STINGTagsPanel(WPFWindow):
         if not doc: return
         sheets = list(FilteredElementCollector(doc)
                       .OfClass(ViewSheet).ToElements())
-        from Autodesk.Revit.DB import BuiltInParameter as BIP
         path = os.path.join(tempfile.gettempdir(), 'STINGTags_SheetIndex.csv')
         with io.open(path, 'w', newline='') as f:
             w = _csv.writer(f)
@@ -9682,17 +10904,10 @@ class STINGTagsPanel(WPFWindow):
         # ── METRIC 2: Tag coverage (weight 20)
         try:
             view = doc.ActiveView
-            all_el = list(FilteredElementCollector(doc, view.Id)
-                          .WhereElementIsNotElementType().ToElements())
-            taggable = [e for e in all_el if e.Category and
+            taggable = [e for e in self._view_elems(doc, view) if e.Category and
                         e.Category.HasMaterialQuantities and not
                         isinstance(e, (IndependentTag, SpatialElementTag))]
-            tags = list(FilteredElementCollector(doc, view.Id)
-                        .OfClass(IndependentTag).ToElements())
-            tagged_ids = set()
-            for t in tags:
-                try: tagged_ids.add(t.TaggedLocalElementId)
-                except Exception: pass
+            tagged_ids = self._tagged_host_ids(doc, view)
             coverage = int(len(tagged_ids) * 100 / len(taggable)) if taggable else 100
             coverage = min(coverage, 100)
             metrics.append({
@@ -76,8 +76,31 @@ class DBSCAN:
     def __init__(self, pts, eps=1.0, min_pts=3):
         self.pts, self.eps, self.min_pts = pts, eps, min_pts
         self.labels = [-1] * len(pts)
+        self._grid = None
+    def _build_grid(self):
+        # Cells of side eps: every neighbour lies in the 3x3 block around a point
+        e = self.eps
+        self._xs = [p.x for p in self.pts]
+        self._ys = [p.y for p in self.pts]
+        grid = {}
+        for i in range(len(self.pts)):
+            grid.setdefault((int(self._xs[i] // e), int(self._ys[i] // e)), []).append(i)
+        self._grid = grid
     def _region_query(self, idx):
-        return [i for i, p in enumerate(self.pts) if self.pts[idx].dist(p) <= self.eps]
+        if self.eps <= 0:
+            return [i for i, p in enumerate(self.pts) if self.pts[idx].dist(p) <= self.eps]
+        if self._grid is None: self._build_grid()
+        xs, ys, e2 = self._xs, self._ys, self.eps * self.eps
+        x, y = xs[idx], ys[idx]
+        cx, cy = int(x // self.eps), int(y // self.eps)
+        res = []
+        for ox in (-1, 0, 1):
+            for oy in (-1, 0, 1):
+                for i in self._grid.get((cx + ox, cy + oy), ()):
+                    dx, dy = xs[i] - x, ys[i] - y
+                    if dx*dx + dy*dy <= e2: res.append(i)
+        res.sort()   # same order as a full scan
+        return res
     def run(self):
         cluster_id = 0
         for i in range(len(self.pts)):
@@ -109,10 +132,10 @@ class ProximityGraph:
         self.pts, self.threshold = pts, threshold
         self.adj = {i: [] for i in range(len(pts))}
     def build(self):
-        n = len(self.pts)
+        n, t2 = len(self.pts), self.threshold * self.threshold
         for i in range(n):
             for j in range(i+1, n):
-                if self.pts[i].dist(self.pts[j]) <= self.threshold:
+                if self.pts[i].dist_sq(self.pts[j]) <= t2:
                     self.adj[i].append(j); self.adj[j].append(i)
     def find_component_of(self, idx):
         visited, stack = set(), [idx]
@@ -192,7 +215,7 @@ class KMeans:
                 if clusters[i]:
                     nc = Vec2(sum(p.x for p in clusters[i])/len(clusters[i]),
                               sum(p.y for p in clusters[i])/len(clusters[i]))
-                    if nc.dist(centroids[i]) > 0.01: moved = True
+                    if nc.dist_sq(centroids[i]) > 1e-4: moved = True
                     centroids[i] = nc
             if not moved: break
         return centroids, clusters
@@ -206,10 +229,11 @@ class SimAnneal:
         pos = pos or [t['pos'] for t in self.tags]
         e = 0
         n = len(pos)
+        sp2 = self.spacing * self.spacing
         for i in range(n):
             for j in range(i+1, n):
-                d = pos[i].dist(pos[j])
-                if d < self.spacing: e += (self.spacing - d)**2 * 100
+                d2 = pos[i].dist_sq(pos[j])
+                if d2 < sp2: e += (self.spacing - math.sqrt(d2))**2 * 100
             d = pos[i].dist(self.tags[i]['elem'])
             if d > self.spacing * 3: e += (d - self.spacing * 3)**2
         return e
@@ -247,10 +271,11 @@ class GeneticAlg:
     def fitness(self, ind):
         score = 1000.0
         n = len(ind)
+        sp2 = self.spacing * self.spacing
         for i in range(n):
             for j in range(i+1, n):
-                d = ind[i].dist(ind[j])
-                if d < self.spacing: score -= (self.spacing - d) * 50
+                d2 = ind[i].dist_sq(ind[j])
+                if d2 < sp2: score -= (self.spacing - math.sqrt(d2)) * 50
             d = ind[i].dist(self.tags[i]['elem'])
             if d > self.spacing * 3: score -= (d - self.spacing * 3) * 10
             elif d < self.spacing * 0.3: score -= (self.spacing * 0.3 - d) * 20
@@ -280,13 +305,16 @@ class ForceEngine:
     def run(self, iters=50):
         n = len(self.tags)
         if n < 2: return
+        reach = self.spacing * 1.5
+        reach2 = reach * reach
         for _ in range(iters):
             forces = [Vec2() for _ in self.tags]
             for i, t in enumerate(self.tags):
                 for j, t2 in enumerate(self.tags):
                     if i != j:
-                        d = t['pos'].dist(t2['pos'])
-                        if d < self.spacing * 1.5 and d > 0.001:
+                        d2 = t['pos'].dist_sq(t2['pos'])
+                        if d2 < reach2 and d2 > 1e-6:
+                            d = math.sqrt(d2)
                             f = (t['pos'] - t2['pos']).norm() * (self.spacing * 1.5 - d)
                             forces[i] = forces[i] + f
                 to_elem = t['elem'] - t['pos']
@@ -294,7 +322,7 @@ class ForceEngine:
                 if d > self.spacing * 0.5:
                     forces[i] = forces[i] + to_elem.norm() * (d - self.spacing * 0.5) * 0.3
             for i, t in enumerate(self.tags):
-                if forces[i].mag() > 0.01: t['pos'] = t['pos'] + forces[i] * self.damp
+                if forces[i].mag_sq() > 1e-4: t['pos'] = t['pos'] + forces[i] * self.damp
             self.damp *= 0.98
 
 
@@ -304,7 +332,8 @@ class LayoutScorer:
         if len(self.tags) < 2: return 100, {}
         pos = [t['pos'] for t in self.tags]
         n, scores = len(pos), {}
-        overlaps = sum(1 for i in range(n) for j in range(i+1,n) if pos[i].dist(pos[j]) < self.spacing)
+        sp2 = self.spacing * self.spacing
+        overlaps = sum(1 for i in range(n) for j in range(i+1,n) if pos[i].dist_sq(pos[j]) < sp2)
         scores['overlap'] = max(0, 30 - (overlaps / max(1, n*(n-1)/2)) * 60)
         cx, cy = sum(p.x for p in pos)/n, sum(p.y for p in pos)/n
         center = Vec2(cx, cy)
@@ -317,7 +346,7 @@ class LayoutScorer:
         xs = [round(p.x, 1) for p in pos]; ys = [round(p.y, 1) for p in pos]
         scores['align'] = min(15, (max(xs.count(x) for x in set(xs)) + max(ys.count(y) for y in set(ys)) - 2) * 3)
         if n > 2:
-            min_ds = [min(pos[i].dist(pos[j]) for j in range(n) if j != i) for i in range(n)]
+            min_ds = [math.sqrt(min(pos[i].dist_sq(pos[j]) for j in range(n) if j != i)) for i in range(n)]
             avg_m = sum(min_ds)/n
             scores['uniform'] = max(0, 15 - sum((d-avg_m)**2 for d in min_ds)/n * 5)
         else: scores['uniform'] = 15
@@ -375,8 +404,9 @@ class SmartOrganizer:
         except: pass
         return None
     def clashes(self):
+        sp2 = self.spacing * self.spacing
         return sum(1 for i in range(len(self.tags)) for j in range(i+1, len(self.tags))
-                   if self.tags[i]['pos'].dist(self.tags[j]['pos']) < self.spacing)
+                   if self.tags[i]['pos'].dist_sq(self.tags[j]['pos']) < sp2)
     def run_pass(self):
         if self.pass_num >= len(self.PASSES): return 'Complete!'
         name = self.PASSES[self.pass_num]
@@ -392,7 +422,7 @@ class SmartOrganizer:
                     center = self.centroids[i]
                     for point in cluster:
                         for t in self.tags:
-                            if t['pos'].dist(point) < 0.01:
+                            if t['pos'].dist_sq(point) < 0.0001:
                                 d = t['pos'] - center
                                 if d.mag() < 0.01: d = Vec2(random.uniform(-1,1), random.uniform(-1,1))
                                 t['pos'] = t['pos'] + d.norm() * self.spacing * 0.3
@@ -413,21 +443,23 @@ class SmartOrganizer:
             SimAnneal(self.tags, self.spacing).run(self.iters * 5)
             result = 'PASS 5: {}\nClashes: {} -> {}'.format(name, before, self.clashes())
         elif self.pass_num == 5:
-            count = 0
+            count, min_d2 = 0, (self.spacing * 0.7) ** 2
             for t in self.tags:
                 d = t['pos'] - t['elem']
                 if d.mag() > 0.01:
                     ang = round(d.angle() / (math.pi/4)) * (math.pi/4)
                     new = Vec2(t['elem'].x + d.mag() * math.cos(ang), t['elem'].y + d.mag() * math.sin(ang))
-                    if all(new.dist(o['pos']) >= self.spacing * 0.7 for o in self.tags if o is not t):
+                    if all(new.dist_sq(o['pos']) >= min_d2 for o in self.tags if o is not t):
                         t['pos'] = new; count += 1
             result = 'PASS 6: {}\nSnapped: {}'.format(name, count)
         elif self.pass_num == 6:
+            sp2 = self.spacing * self.spacing
             for _ in range(5):
                 for i in range(len(self.tags)):
                     for j in range(i+1, len(self.tags)):
-                        d = self.tags[i]['pos'].dist(self.tags[j]['pos'])
-                        if d < self.spacing and d > 0.001:
+                        d2 = self.tags[i]['pos'].dist_sq(self.tags[j]['pos'])
+                        if d2 < sp2 and d2 > 1e-6:
+                            d = math.sqrt(d2)
                             push = (self.tags[i]['pos'] - self.tags[j]['pos']).norm() * (self.spacing - d) * 0.5
                             self.tags[i]['pos'] = self.tags[i]['pos'] + push
                             self.tags[j]['pos'] = self.tags[j]['pos'] - push
@@ -747,7 +779,7 @@ class SelectionEngine:
         sel_centers = [self._get_bb_center(e) for e in sel if self._get_bb_center(e)]
         for i, pos in enumerate(positions):
             for sc in sel_centers:
-                if pos.dist(sc) < 0.1: sel_indices.add(i); break
+                if pos.dist_sq(sc) < 0.01: sel_indices.add(i); break
         if not sel_indices: return 0, 'Selection not in MEP set'
         graph = ProximityGraph(positions, threshold=3.0); graph.build()
         connected = set()
@@ -777,7 +809,7 @@ class SelectionEngine:
             if label == -1: continue
             cc = Vec2(sum(positions[i].x for i in indices)/len(indices),
                       sum(positions[i].y for i in indices)/len(indices))
-            d = sel_center.dist(cc)
+            d = sel_center.dist_sq(cc)
             if d < min_dist: min_dist = d; best_cluster = label
         if best_cluster == -1: return 0, 'No cluster found'
         result = [elem_map[i] for i in clusters[best_cluster] if i in elem_map]
@@ -850,10 +882,10 @@ class SelectionEngine:
         if not sel: return 0
         centers = [self._get_bb_center(e) for e in sel if self._get_bb_center(e)]
         if not centers: return 0
-        near = []
+        near, r2 = [], radius * radius
         for e in self._collect_cat_all():
             c = self._get_bb_center(e)
-            if c and any(c.dist(sc) <= radius for sc in centers): near.append(e)
+            if c and any(c.dist_sq(sc) <= r2 for sc in centers): near.append(e)
         return self._set_selection(near)
 
     def in_room(self):